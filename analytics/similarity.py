@@ -0,0 +1,293 @@
+"""
+Recommandation de streamers similaires à partir des profils scrapés.
+
+Chaque chaîne est décrite par deux blocs de features :
+- ses heures par jeu (`top_games`), en matrice creuse chaîne × jeu, log-compressées puis normalisées ;
+- ses statistiques numériques (`additional_stats`), log-compressées puis centrées-réduites.
+La similarité entre deux chaînes est le cosinus de leurs vecteurs.
+
+L'index est sauvegardé par run de scraping (version de la collection `profiles`) dans INDEX_DIR.
+La reconstruction est incrémentale : seules les chaînes dont le profil a changé depuis l'index
+précédent sont re-featurisées. Au-delà de APPROX_MIN_CHANNELS chaînes, les recherches passent par
+un index approché (LSH par hyperplans aléatoires) et ne re-classent que les candidats.
+"""
+import glob
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from db.mongo_client import get_db
+from db.versions import get_data_version
+from scraper.numbers import parse_number
+
+INDEX_DIR = os.getenv("TWITCHTRACKER_SIMILARITY_DIR", ".cache/similarity")
+KEEP_RUNS = 3
+# Poids du bloc statistiques face au bloc jeux dans le vecteur final
+STATS_WEIGHT = 0.35
+# Recherche approchée (LSH) à partir de ce nombre de chaînes ; exacte en dessous.
+# À 300k chaînes : ~3x plus rapide que la recherche exacte, ~80 % des 10 plus proches retrouvés
+APPROX_MIN_CHANNELS = 100_000
+LSH_TABLES = 16
+LSH_BITS = 8
+
+
+# ---------- Features ----------
+
+def profile_fingerprint(doc):
+    """Empreinte des champs utilisés par l'index : change seulement si le profil a changé"""
+    payload = json.dumps([doc.get("top_games") or [], doc.get("additional_stats") or {}], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def profile_features(doc):
+    """({jeu: heures}, {statistique: valeur}) d'un document profil"""
+    games = {}
+    for game in doc.get("top_games") or []:
+        hours = parse_number(game.get("hours"))
+        if game.get("game") and hours:
+            games[game["game"]] = games.get(game["game"], 0.0) + float(hours)
+    stats = {}
+    for key, value in (doc.get("additional_stats") or {}).items():
+        number = parse_number(value)
+        if number is not None:
+            stats[key] = float(number)
+    return games, stats
+
+
+def _signed_log(values):
+    return np.sign(values) * np.log1p(np.abs(values))
+
+
+def _normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+# ---------- Index ----------
+
+class SimilarityIndex:
+    """
+    Données brutes de l'index (heures par jeu, statistiques, empreintes) et vecteurs normalisés
+    qui en sont dérivés. Les données brutes sont persistées ; les vecteurs et tables LSH sont
+    recalculés au chargement (opérations vectorisées).
+    """
+
+    def __init__(self, names, fingerprints, games, stat_keys, game_hours, stats, version=None, built_at=None):
+        self.names = list(names)
+        self.fingerprints = list(fingerprints)
+        self.games = list(games)
+        self.stat_keys = list(stat_keys)
+        self.game_hours = sparse.csr_matrix(game_hours, dtype=np.float32)
+        self.stats = np.asarray(stats, dtype=np.float32).reshape(len(self.names), len(self.stat_keys))
+        self.version = version
+        self.built_at = built_at
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.vectors = self._vectors()
+        self.lsh = self._lsh() if len(self.names) >= APPROX_MIN_CHANNELS else None
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def build(cls, docs, previous=None, version=None):
+        """
+        Construit l'index à partir des documents profil. Les chaînes présentes dans `previous`
+        avec la même empreinte reprennent leurs lignes telles quelles ; les autres sont featurisées.
+        Renvoie (index, nombre de chaînes recalculées).
+        """
+        games = list(previous.games) if previous else []
+        stat_keys = list(previous.stat_keys) if previous else []
+        game_columns = {game: i for i, game in enumerate(games)}
+        stat_columns = {key: i for i, key in enumerate(stat_keys)}
+
+        kept_names, kept_fingerprints, kept_rows = [], [], []
+        new_names, new_fingerprints, new_features = [], [], []
+        for doc in docs:
+            name = doc.get("name")
+            if not name:
+                continue
+            fingerprint = profile_fingerprint(doc)
+            row = previous.positions.get(name) if previous else None
+            if row is not None and previous.fingerprints[row] == fingerprint:
+                kept_names.append(name)
+                kept_fingerprints.append(fingerprint)
+                kept_rows.append(row)
+                continue
+            features = profile_features(doc)
+            for game in features[0]:
+                if game not in game_columns:
+                    game_columns[game] = len(games)
+                    games.append(game)
+            for key in features[1]:
+                if key not in stat_columns:
+                    stat_columns[key] = len(stat_keys)
+                    stat_keys.append(key)
+            new_names.append(name)
+            new_fingerprints.append(fingerprint)
+            new_features.append(features)
+
+        # Lignes reprises : le vocabulaire ne fait que s'allonger, on complète par des colonnes vides
+        if kept_rows:
+            kept_hours = previous.game_hours[kept_rows]
+            kept_hours = sparse.csr_matrix(
+                (kept_hours.data, kept_hours.indices, kept_hours.indptr), shape=(len(kept_rows), len(games))
+            )
+            kept_stats = np.full((len(kept_rows), len(stat_keys)), np.nan, dtype=np.float32)
+            kept_stats[:, :len(previous.stat_keys)] = previous.stats[kept_rows]
+        else:
+            kept_hours = sparse.csr_matrix((0, len(games)), dtype=np.float32)
+            kept_stats = np.empty((0, len(stat_keys)), dtype=np.float32)
+
+        rows, columns, values = [], [], []
+        new_stats = np.full((len(new_features), len(stat_keys)), np.nan, dtype=np.float32)
+        for i, (game_hours, stats) in enumerate(new_features):
+            for game, hours in game_hours.items():
+                rows.append(i)
+                columns.append(game_columns[game])
+                values.append(hours)
+            for key, value in stats.items():
+                new_stats[i, stat_columns[key]] = value
+        new_hours = sparse.csr_matrix((values, (rows, columns)), shape=(len(new_features), len(games)), dtype=np.float32)
+
+        index = cls(
+            kept_names + new_names, kept_fingerprints + new_fingerprints, games, stat_keys,
+            sparse.vstack([kept_hours, new_hours], format="csr"), np.vstack([kept_stats, new_stats]),
+            version=version, built_at=datetime.now(timezone.utc).isoformat()
+        )
+        return index, len(new_names)
+
+    def _vectors(self):
+        """Vecteurs unitaires [jeux | statistiques] : le produit scalaire est la similarité cosinus"""
+        hours = self.game_hours.copy()
+        hours.data = np.log1p(hours.data)
+        blocks = [_normalize_rows(hours) * (1 - STATS_WEIGHT)]
+
+        if self.stat_keys and len(self.names):
+            stats = _signed_log(self.stats)
+            with np.errstate(invalid="ignore"):
+                mean = np.nanmean(stats, axis=0)
+                std = np.nanstd(stats, axis=0)
+            std[~(std > 0)] = 1.0
+            scaled = np.nan_to_num((stats - mean) / std)  # statistique absente = valeur moyenne
+            norms = np.linalg.norm(scaled, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            blocks.append(sparse.csr_matrix(scaled / norms * STATS_WEIGHT))
+
+        return _normalize_rows(sparse.hstack(blocks, format="csr")).astype(np.float32).tocsr()
+
+    def _lsh(self):
+        """Tables LSH : signe des projections sur LSH_BITS hyperplans aléatoires, par table"""
+        rng = np.random.default_rng(0)
+        planes = rng.standard_normal((self.vectors.shape[1], LSH_TABLES * LSH_BITS)).astype(np.float32)
+        bits = (self.vectors @ planes > 0).reshape(len(self.names), LSH_TABLES, LSH_BITS)
+        keys = bits.astype(np.int64) @ (1 << np.arange(LSH_BITS, dtype=np.int64))  # (chaînes, tables)
+        tables = []
+        for table in range(LSH_TABLES):
+            order = np.argsort(keys[:, table], kind="stable")
+            tables.append((keys[order, table], order))
+        return keys, tables
+
+    def _candidates(self, row):
+        keys, tables = self.lsh
+        found = []
+        for table, (sorted_keys, order) in enumerate(tables):
+            key = keys[row, table]
+            start, end = np.searchsorted(sorted_keys, [key, key + 1])
+            found.append(order[start:end])
+        return np.unique(np.concatenate(found))
+
+    def similar(self, name, k=10, exact=None):
+        """
+        Les `k` chaînes les plus proches de `name` : DataFrame (name, similarity) trié.
+        `exact` force la recherche exacte (True) ou approchée (False) ; par défaut approchée
+        seulement si l'index dépasse APPROX_MIN_CHANNELS chaînes.
+        """
+        row = self.positions.get(name)
+        if row is None:
+            raise KeyError(f"Chaîne absente de l'index de similarité : {name}")
+        approximate = self.lsh is not None if exact is None else not exact
+        if approximate and self.lsh is None:
+            self.lsh = self._lsh()
+
+        candidates = self._candidates(row) if approximate else np.arange(len(self.names))
+        scores = np.asarray((self.vectors[candidates] @ self.vectors[row].T).todense()).ravel()
+        scores[candidates == row] = -np.inf
+        top = min(k, max(len(candidates) - 1, 0))
+        best = np.argpartition(-scores, top - 1)[:top] if top else np.empty(0, dtype=int)
+        best = best[np.argsort(-scores[best])]
+        best = best[scores[best] > 0]
+        return pd.DataFrame({
+            "name": [self.names[i] for i in candidates[best]],
+            "similarity": scores[best].astype(float),
+        })
+
+    # ---------- Persistance ----------
+
+    def save(self, directory=INDEX_DIR):
+        """Écrit l'index dans <directory>/<version>/ (écriture dans un dossier temporaire puis renommage)"""
+        path = os.path.join(directory, str(self.version))
+        tmp = f"{path}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        sparse.save_npz(os.path.join(tmp, "game_hours.npz"), self.game_hours)
+        np.save(os.path.join(tmp, "stats.npy"), self.stats)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": self.version, "built_at": self.built_at, "names": self.names,
+                "fingerprints": self.fingerprints, "games": self.games, "stat_keys": self.stat_keys,
+            }, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, version=None, directory=INDEX_DIR):
+        """Index d'une version donnée, ou le plus récent ; None s'il n'y en a pas"""
+        if version is None:
+            runs = _saved_versions(directory)
+            if not runs:
+                return None
+            version = runs[-1]
+        path = os.path.join(directory, str(version))
+        if not os.path.isdir(path):
+            return None
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(
+            meta["names"], meta["fingerprints"], meta["games"], meta["stat_keys"],
+            sparse.load_npz(os.path.join(path, "game_hours.npz")), np.load(os.path.join(path, "stats.npy")),
+            version=meta["version"], built_at=meta["built_at"]
+        )
+
+
+def _saved_versions(directory=INDEX_DIR):
+    runs = [os.path.basename(path) for path in glob.glob(os.path.join(directory, "*")) if os.path.isdir(path)]
+    return sorted((run for run in runs if run.isdigit()), key=int)
+
+
+def update_index(full=False, directory=INDEX_DIR):
+    """
+    Met à jour l'index pour la version courante de la collection `profiles` :
+    repart de l'index précédent (sauf `full`) et ne recalcule que les profils modifiés.
+    Garde les KEEP_RUNS derniers index. Renvoie l'index.
+    """
+    version = get_data_version("profiles")
+    previous = None if full else SimilarityIndex.load(directory=directory)
+    if previous is not None and previous.version == version:
+        print(f"🧭 Index de similarité déjà à jour (version {version})")
+        return previous
+
+    cursor = get_db()["profiles"].find({}, {"_id": 0, "name": 1, "top_games": 1, "additional_stats": 1})
+    index, changed = SimilarityIndex.build(cursor, previous, version=version)
+    index.save(directory)
+    for stale in _saved_versions(directory)[:-KEEP_RUNS]:
+        shutil.rmtree(os.path.join(directory, stale), ignore_errors=True)
+    print(f"🧭 Index de similarité v{version} : {len(index)} chaînes, {changed} recalculées")
+    return index
@@ -0,0 +1,360 @@
+"""
+Analyses sur l'historique des snapshots : croissance, évolution de rang, pics d'audience
+et meilleures heures de stream. Tous les calculs sont vectorisés (group-bys pandas sur des
+DataFrames triés par chaîne puis date), sans boucle Python par chaîne.
+
+Les fonctions `channel_trends`, `stream_spikes_report` et `best_hours` chargent les données
+(MongoDB, ou l'export Parquet s'il couvre la fenêtre analysée, voir resolve_source) et mettent
+le résultat en cache sur disque, par version de snapshot : un nouveau run de scraping invalide le cache.
+"""
+import glob
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from db.mongo_client import get_db
+from db.parquet_export import EXPORT_DIR, load_table
+from db.snapshots import PROFILE_SNAPSHOTS, RANKING_SNAPSHOTS
+from scraper.numbers import parse_number_series
+
+CACHE_DIR = os.getenv("TWITCHTRACKER_ANALYTICS_CACHE", ".cache/analytics")
+GROWTH_FIELDS = ("total_followers", "avg_viewers")
+HISTORY_COLUMNS = ["name", "scraped_at", "rank", *GROWTH_FIELDS]
+STREAM_COLUMNS = ["name", "started_at", "game", "max_viewers"]
+# Heures d'historique lues en plus de la fenêtre de croissance (runs manqués, en retard ou espacés)
+TREND_MARGIN_HOURS = 6
+# Jours de streams analysés par les pics d'audience et les meilleures heures
+STREAM_HISTORY_DAYS = int(os.getenv("TWITCHTRACKER_STREAM_HISTORY_DAYS", "90"))
+
+
+# ---------- Chargement ----------
+
+def _export_dates(table, region=None):
+    """Dates (AAAA-MM-JJ) des partitions exportées d'une table, triées"""
+    pattern = os.path.join(EXPORT_DIR, table, f"region={region or '*'}", "date=*")
+    return sorted(os.path.basename(path).split("=", 1)[1] for path in glob.glob(pattern))
+
+
+def _latest_mongo_snapshot(collection_name, region=None):
+    query = {"region": region} if region else {}
+    doc = get_db()[collection_name].find_one(query, {"scraped_at": 1}, sort=[("scraped_at", -1)])
+    return doc["scraped_at"] if doc else None
+
+
+def resolve_source(table, collection_name, start, region=None, source="auto"):
+    """
+    Source à lire pour une fenêtre commençant à `start` : "parquet" ou "mongo" si demandée explicitement.
+    En "auto", MongoDB (source de vérité), sauf si l'export Parquet, facultatif et parfois partiel ou en
+    retard, couvre toute la fenêtre : une partition antérieure au jour de `start` (journée de début complète)
+    et une partition du jour du dernier snapshot MongoDB.
+    """
+    if source != "auto":
+        return source
+    dates = _export_dates(table, region)
+    if start is None or not dates or dates[0] >= f"{start:%Y-%m-%d}":
+        return "mongo"
+    latest = _latest_mongo_snapshot(collection_name, region)
+    return "parquet" if latest is not None and dates[-1] >= f"{latest:%Y-%m-%d}" else "mongo"
+
+
+def _prepare_history(df):
+    """Types compacts (nom catégoriel, float32) et tri (chaîne, date) requis par les group-bys"""
+    df = df[HISTORY_COLUMNS].copy()
+    df["name"] = df["name"].astype("category")
+    df["scraped_at"] = pd.to_datetime(df["scraped_at"], utc=True)
+    for field in ("rank", *GROWTH_FIELDS):
+        df[field] = parse_number_series(df[field]).astype("float32")
+    return df.sort_values(["name", "scraped_at"], kind="stable").reset_index(drop=True)
+
+
+def load_ranking_history(region=None, start=None, end=None, source="auto"):
+    """
+    Historique des classements (une ligne par chaîne et par snapshot).
+    `source` : "parquet" (export de db/parquet_export.py), "mongo", ou "auto" (voir resolve_source).
+    """
+    if resolve_source("rankings", RANKING_SNAPSHOTS, start, region, source) == "parquet":
+        table = load_table(
+            "rankings", regions=[region] if region else None,
+            start=f"{start:%Y-%m-%d}" if start else None, end=f"{end:%Y-%m-%d}" if end else None,
+            columns=HISTORY_COLUMNS
+        )
+        df = table.to_pandas()
+    else:
+        query = {}
+        if region:
+            query["region"] = region
+        if start or end:
+            query["scraped_at"] = {}
+            if start:
+                query["scraped_at"]["$gte"] = start
+            if end:
+                query["scraped_at"]["$lt"] = end
+        projection = {"_id": 0, **{column: 1 for column in HISTORY_COLUMNS}}
+        cursor = get_db()[RANKING_SNAPSHOTS].find(query, projection).batch_size(10_000)
+        df = pd.DataFrame.from_records(cursor, columns=HISTORY_COLUMNS)
+    return _prepare_history(df)
+
+
+def _stream_history_start(days):
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def load_stream_history(days=STREAM_HISTORY_DAYS, source="auto"):
+    """
+    Streams récents vus dans les profils sur les `days` derniers jours, dédoublonnés (un même stream
+    apparaît dans plusieurs snapshots successifs, le dernier l'emporte) : name, started_at, game, max_viewers.
+    Côté MongoDB, la fenêtre et le dédoublonnage sont appliqués par le pipeline d'agrégation :
+    seule une ligne par stream est transférée.
+    """
+    since = _stream_history_start(days)
+    if resolve_source("profile_recent_streams", PROFILE_SNAPSHOTS, since, source=source) == "parquet":
+        df = load_table("profile_recent_streams", start=f"{since:%Y-%m-%d}", columns=STREAM_COLUMNS).to_pandas()
+    else:
+        pipeline = [
+            {"$match": {"scraped_at": {"$gte": since}}},
+            {"$sort": {"scraped_at": 1}},
+            {"$unwind": "$recent_streams"},
+            # Dates au format "AAAA-MM-JJ HH:MM:SS" : comparables comme chaînes
+            {"$match": {"recent_streams.date": {"$gte": f"{since:%Y-%m-%d %H:%M:%S}"}}},
+            {"$group": {
+                "_id": {"name": "$name", "started_at": "$recent_streams.date"},
+                "game": {"$last": "$recent_streams.game"},
+                "max_viewers": {"$last": "$recent_streams.max_viewers"},
+            }},
+            {"$project": {"_id": 0, "name": "$_id.name", "started_at": "$_id.started_at", "game": 1, "max_viewers": 1}},
+        ]
+        cursor = get_db()[PROFILE_SNAPSHOTS].aggregate(pipeline, allowDiskUse=True)
+        df = pd.DataFrame.from_records(cursor, columns=STREAM_COLUMNS)
+
+    df["started_at"] = pd.to_datetime(df["started_at"], errors="coerce", utc=True)
+    df["max_viewers"] = parse_number_series(df["max_viewers"]).astype("float32")
+    df = df.dropna(subset=["started_at", "max_viewers"])
+    df = df[df["started_at"] >= since].drop_duplicates(["name", "started_at"], keep="last")
+    df["name"] = df["name"].astype("category")
+    return df.sort_values(["name", "started_at"], kind="stable").reset_index(drop=True)
+
+
+# ---------- Calculs vectorisés ----------
+
+def trend_span(periods):
+    """Profondeur d'historique utile à une croissance sur `periods` heures : la fenêtre plus sa marge"""
+    return timedelta(hours=periods + max(TREND_MARGIN_HOURS, periods // 4))
+
+
+def _values_before(history, names, targets, fields, tolerance=None):
+    """
+    Valeurs de `fields` au snapshot de chaque chaîne le plus récent antérieur ou égal à sa date cible
+    (merge_asof par chaîne, au plus `tolerance` avant la cible), dans l'ordre de `names` / `targets`.
+    NaN si aucun snapshot ne convient.
+    """
+    wanted = pd.DataFrame({"name": names.array, "target": targets.array, "position": np.arange(len(names))})
+    past = history[["name", "scraped_at", *fields]].sort_values("scraped_at", kind="stable")
+    matched = pd.merge_asof(
+        wanted.sort_values("target", kind="stable"), past, left_on="target", right_on="scraped_at",
+        by="name", direction="backward", tolerance=tolerance
+    )
+    return matched.sort_values("position")[list(fields)].to_numpy(dtype="float64", copy=True)
+
+
+def growth_rates(history, periods=24, fields=GROWTH_FIELDS):
+    """
+    Croissance de chaque champ sur `periods` heures, pour chaque snapshot :
+    (valeur - valeur de référence) / valeur de référence, la référence étant le snapshot de la chaîne
+    le plus récent datant d'au moins `periods` heures (au plus la marge de trend_span en plus).
+    Ne dépend pas de la cadence des runs.
+    """
+    out = history[["name", "scraped_at"]].copy()
+    previous = _values_before(
+        history, history["name"], history["scraped_at"] - timedelta(hours=periods), fields, tolerance=trend_span(periods) - timedelta(hours=periods)
+    )
+    previous[previous == 0] = np.nan
+    for i, field in enumerate(fields):
+        out[f"{field}_growth"] = (history[field].to_numpy() - previous[:, i]) / previous[:, i]
+    return out
+
+
+def rank_deltas(history):
+    """Places gagnées (positif) ou perdues (négatif) depuis le snapshot précédent de la chaîne"""
+    previous = history.groupby("name", observed=True, sort=False)["rank"].shift(1)
+    out = history[["name", "scraped_at", "rank"]].copy()
+    out["rank_delta"] = previous - history["rank"]
+    return out
+
+
+def _group_bounds(history):
+    """Positions de la première et de la dernière ligne de chaque chaîne (historique trié par chaîne)"""
+    names = history["name"]
+    if names.empty:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    codes = names.cat.codes.to_numpy() if isinstance(names.dtype, pd.CategoricalDtype) else pd.factorize(names)[0]
+    last = np.flatnonzero(np.r_[codes[1:] != codes[:-1], True])
+    first = np.r_[0, last[:-1] + 1]
+    return first, last
+
+
+def latest_trends(history, periods=24):
+    """
+    Dernier état de chaque chaîne : rang, évolution de rang et croissances sur `periods` heures,
+    par rapport au snapshot le plus récent antérieur ou égal à (dernier snapshot de la chaîne - `periods` h).
+    Seuls les snapshots de la fenêtre trend_span précédant le dernier snapshot sont pris en compte :
+    le résultat est le même que l'historique ait été chargé en entier ou depuis trend_window_start,
+    quelle que soit la cadence des runs.
+    """
+    if not history.empty:
+        history = history[history["scraped_at"] >= history["scraped_at"].max() - trend_span(periods)]
+    first, last = _group_bounds(history)
+
+    latest = history.iloc[last][["name", "scraped_at", "rank", *GROWTH_FIELDS]].reset_index(drop=True)
+    ranks = history["rank"].to_numpy()
+    latest["rank_delta"] = np.where(last > first, ranks[np.maximum(last - 1, 0)], np.nan) - latest["rank"].to_numpy()
+    previous = _values_before(
+        history, latest["name"], latest["scraped_at"] - timedelta(hours=periods), GROWTH_FIELDS
+    )
+    previous[previous == 0] = np.nan
+    for i, field in enumerate(GROWTH_FIELDS):
+        latest[f"{field}_growth"] = (latest[field].to_numpy() - previous[:, i]) / previous[:, i]
+    return latest.sort_values("rank").reset_index(drop=True)
+
+
+def stream_spikes(streams, method="zscore", threshold=None, min_streams=5):
+    """
+    Streams dont le pic de viewers sort de l'ordinaire pour la chaîne :
+    - "zscore" : (x - moyenne) / écart-type > `threshold` (3 par défaut) ;
+    - "iqr" : (x - Q3) / (Q3 - Q1) > `threshold` (1.5 par défaut, règle de Tukey).
+    Les chaînes avec moins de `min_streams` streams sont ignorées.
+    """
+    grouped = streams.groupby("name", observed=True, sort=False)["max_viewers"]
+    values = streams["max_viewers"]
+    if method == "zscore":
+        threshold = 3.0 if threshold is None else threshold
+        std = grouped.transform("std")
+        score = (values - grouped.transform("mean")) / std.where(std > 0)
+    elif method == "iqr":
+        threshold = 1.5 if threshold is None else threshold
+        q1 = grouped.transform("quantile", 0.25)
+        q3 = grouped.transform("quantile", 0.75)
+        iqr = q3 - q1
+        score = (values - q3) / iqr.where(iqr > 0)
+    else:
+        raise ValueError(f"Méthode inconnue : {method}")
+
+    mask = (grouped.transform("size") >= min_streams) & (score > threshold)
+    spikes = streams.loc[mask].copy()
+    spikes["score"] = score[mask]
+    return spikes.sort_values("score", ascending=False).reset_index(drop=True)
+
+
+def hour_of_day_performance(streams, by_channel=False):
+    """
+    Performance par heure de début (UTC) : pic de viewers relatif à la médiane de la chaîne
+    (1.0 = audience habituelle), ce qui rend comparables petites et grosses chaînes.
+    """
+    median = streams.groupby("name", observed=True, sort=False)["max_viewers"].transform("median")
+    frame = pd.DataFrame({
+        "name": streams["name"],
+        "hour": streams["started_at"].dt.hour.astype("int8"),
+        "relative_viewers": streams["max_viewers"] / median.where(median > 0),
+        "max_viewers": streams["max_viewers"],
+    })
+    keys = ["name", "hour"] if by_channel else ["hour"]
+    return frame.groupby(keys, observed=True).agg(
+        streams=("max_viewers", "size"),
+        relative_viewers=("relative_viewers", "mean"),
+        median_viewers=("max_viewers", "median"),
+    ).reset_index()
+
+
+# ---------- Cache par snapshot ----------
+
+def snapshot_version(table, collection_name, source="auto"):
+    """
+    Version des données analysées : date du dernier snapshot MongoDB, ou date de modification
+    du dernier fichier Parquet exporté (`source` "parquet"). Change à chaque run de scraping.
+    """
+    if source == "parquet":
+        files = glob.glob(os.path.join(EXPORT_DIR, table, "**", "*.parquet"), recursive=True)
+        return str(max((os.path.getmtime(path) for path in files), default=0))
+    latest = _latest_mongo_snapshot(collection_name)
+    return latest.isoformat() if latest else "empty"
+
+
+def _cached(name, version, params, compute):
+    """Résultat de `compute()` mis en cache sur disque pour la version `version` des données"""
+    params_key = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:12]
+    version_key = hashlib.sha1(version.encode()).hexdigest()[:12]
+    path = os.path.join(CACHE_DIR, f"{name}-{params_key}-{version_key}.pkl")
+    if os.path.exists(path):
+        return pd.read_pickle(path)
+
+    result = compute()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    for stale in glob.glob(os.path.join(CACHE_DIR, f"{name}-{params_key}-*.pkl")):
+        os.remove(stale)
+    result.to_pickle(path)
+    return result
+
+
+def latest_snapshot_at(region=None, source="auto"):
+    """
+    Date du dernier snapshot de classement de la région (None s'il n'y en a aucun),
+    lue dans l'export Parquet avec `source` "parquet", sinon dans MongoDB.
+    """
+    if source == "parquet":
+        dates = _export_dates("rankings", region)
+        # Partitions journalières : fin de la journée la plus récente
+        return pd.Timestamp(dates[-1], tz="UTC") + pd.Timedelta(days=1) if dates else None
+    return _latest_mongo_snapshot(RANKING_SNAPSHOTS, region)
+
+
+def trend_window_start(region=None, periods=24, source="auto"):
+    """
+    Début de l'historique utile à latest_trends pour une croissance sur `periods` heures : trend_span
+    avant le dernier snapshot, et non avant l'heure courante, pour que les tendances restent affichées
+    si le scraping s'est arrêté.
+    """
+    latest = latest_snapshot_at(region, source)
+    if latest is None:
+        return None
+    return latest - trend_span(periods)
+
+
+def channel_trends(region=None, periods=24, source="auto"):
+    """
+    Dernier rang, évolution de rang et croissances de chaque chaîne d'une région.
+    Seule la fenêtre nécessaire de l'historique est chargée (voir trend_window_start).
+    """
+    start = trend_window_start(region, periods, "parquet" if source == "parquet" else "mongo")
+    source = resolve_source("rankings", RANKING_SNAPSHOTS, start, region, source)
+    return _cached(
+        "channel_trends", snapshot_version("rankings", RANKING_SNAPSHOTS, source),
+        {"region": region, "periods": periods, "source": source},
+        lambda: latest_trends(load_ranking_history(region, start=start, source=source), periods)
+    )
+
+
+def rising_stars(region=None, periods=24 * 7, top=20, field="total_followers", source="auto"):
+    """Chaînes à la plus forte croissance de `field` sur `periods` heures"""
+    trends = channel_trends(region, periods, source)
+    return trends.nlargest(top, f"{field}_growth")
+
+
+def stream_spikes_report(method="zscore", threshold=None, min_streams=5, days=STREAM_HISTORY_DAYS, source="auto"):
+    source = resolve_source("profile_recent_streams", PROFILE_SNAPSHOTS, _stream_history_start(days), source=source)
+    return _cached(
+        "stream_spikes", snapshot_version("profile_recent_streams", PROFILE_SNAPSHOTS, source),
+        {"method": method, "threshold": threshold, "min_streams": min_streams, "days": days, "source": source},
+        lambda: stream_spikes(load_stream_history(days, source), method, threshold, min_streams)
+    )
+
+
+def best_hours(by_channel=False, days=STREAM_HISTORY_DAYS, source="auto"):
+    source = resolve_source("profile_recent_streams", PROFILE_SNAPSHOTS, _stream_history_start(days), source=source)
+    return _cached(
+        "best_hours", snapshot_version("profile_recent_streams", PROFILE_SNAPSHOTS, source),
+        {"by_channel": by_channel, "days": days, "source": source},
+        lambda: hour_of_day_performance(load_stream_history(days, source), by_channel)
+    )
@@ -0,0 +1,153 @@
+"""
+Temps des analyses vectorisées (analytics/trends.py) sur un historique synthétique :
+par défaut 5 000 chaînes × 1 an de snapshots horaires (~44 M lignes, ~1 Go en mémoire).
+
+Le chargement est mesuré aussi : les `--load-channels` premières chaînes sont exportées en Parquet
+partitionné (répertoire temporaire), puis relues en entier et sur la seule fenêtre de channel_trends.
+Avec `--mongo`, même mesure sur les snapshots insérés dans la base MONGODB_DB (twitchtracker_bench
+par défaut, jamais la base du scraper).
+
+    python -m benchmarks.bench_analytics --channels 5000 --hours 8760
+    python -m benchmarks.bench_analytics --mongo --load-channels 200
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+# Données du benchmark isolées : export Parquet et cache d'analyses temporaires, base Mongo dédiée
+BENCH_DIR = tempfile.mkdtemp(prefix="bench_analytics_")
+os.environ["TWITCHTRACKER_EXPORT_DIR"] = BENCH_DIR
+os.environ["TWITCHTRACKER_ANALYTICS_CACHE"] = os.path.join(BENCH_DIR, "cache")
+os.environ["MONGODB_DB"] = os.getenv("BENCH_MONGODB_DB", "twitchtracker_bench")
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from analytics.trends import (
+    growth_rates,
+    hour_of_day_performance,
+    latest_trends,
+    load_ranking_history,
+    rank_deltas,
+    stream_spikes,
+    trend_window_start,
+)
+from db.parquet_export import PARTITIONING
+from db.snapshots import RANKING_SNAPSHOTS
+
+
+def synthetic_history(channels, hours, seed=0):
+    """Historique déjà au format de load_ranking_history : trié par (chaîne, date), types compacts"""
+    rng = np.random.default_rng(seed)
+    rows = channels * hours
+    start = pd.Timestamp("2025-01-01", tz="UTC")
+    base_followers = rng.lognormal(10, 1.5, channels).astype("float32")
+    base_viewers = rng.lognormal(6, 1.5, channels).astype("float32")
+    trend = np.repeat(rng.normal(1e-4, 5e-5, channels).astype("float32"), hours)
+    step = np.tile(np.arange(hours, dtype="float32"), channels)
+    return pd.DataFrame({
+        "name": pd.Categorical.from_codes(np.repeat(np.arange(channels, dtype="int32"), hours),
+                                          [f"streamer_{i}" for i in range(channels)]),
+        "scraped_at": np.tile(start + pd.to_timedelta(np.arange(hours), unit="h"), channels),
+        "rank": rng.integers(1, channels + 1, rows).astype("float32"),
+        "total_followers": np.repeat(base_followers, hours) * (1 + trend * step),
+        "avg_viewers": np.repeat(base_viewers, hours) * rng.lognormal(0, 0.2, rows).astype("float32"),
+    })
+
+
+def synthetic_streams(channels, streams_per_channel, seed=1):
+    rng = np.random.default_rng(seed)
+    rows = channels * streams_per_channel
+    start = pd.Timestamp("2025-01-01", tz="UTC")
+    return pd.DataFrame({
+        "name": pd.Categorical.from_codes(np.repeat(np.arange(channels, dtype="int32"), streams_per_channel),
+                                          [f"streamer_{i}" for i in range(channels)]),
+        "started_at": start + pd.to_timedelta(rng.integers(0, 365 * 24, rows), unit="h"),
+        "game": "Just Chatting",
+        "max_viewers": rng.lognormal(7, 0.6, rows).astype("float32"),
+    })
+
+
+def export_history(history, region="fr"):
+    """Historique synthétique -> <BENCH_DIR>/rankings/region=<region>/date=<AAAA-MM-JJ>/ (comme l'export du scraper)"""
+    days = history["scraped_at"].dt.normalize()
+    table = pa.Table.from_pandas(history.assign(
+        name=history["name"].astype(str), region=region, date=days.dt.strftime("%Y-%m-%d")
+    ), preserve_index=False)
+    ds.write_dataset(table, os.path.join(BENCH_DIR, "rankings"), format="parquet",
+                     partitioning=PARTITIONING, existing_data_behavior="overwrite_or_ignore")
+
+
+def insert_history(history, region="fr", chunk_size=50_000):
+    from db.mongo_client import get_db
+
+    collection = get_db()[RANKING_SNAPSHOTS]
+    collection.drop()
+    collection.create_index([("region", 1), ("scraped_at", 1)])
+    records = history.assign(name=history["name"].astype(str), region=region,
+                             scraped_at=history["scraped_at"].dt.tz_localize(None))
+    for start in range(0, len(records), chunk_size):
+        collection.insert_many(records.iloc[start:start + chunk_size].to_dict("records"), ordered=False)
+    return collection
+
+
+def bench_load(source, periods):
+    full = timed(f"load {source} (tout l'historique)", load_ranking_history, "fr", source=source)
+    start = trend_window_start("fr", periods, source)
+    window = timed(f"load {source} (fenêtre {periods} h)", load_ranking_history, "fr", start=start, source=source)
+    print(f"  {'':32s} {len(full):,} -> {len(window):,} lignes")
+    trends = timed("latest_trends sur la fenêtre", latest_trends, window, periods)
+    # La fenêtre doit donner exactement les tendances de l'historique complet
+    pd.testing.assert_frame_equal(latest_trends(full, periods), trends, check_categorical=False)
+    print(f"  {'':32s} ✅ tendances identiques à l'historique complet")
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f"  {label:32s} {time.perf_counter() - start:7.2f} s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, default=5000)
+    parser.add_argument("--hours", type=int, default=24 * 365)
+    parser.add_argument("--streams", type=int, default=300, help="streams par chaîne")
+    parser.add_argument("--load-channels", type=int, default=500, help="chaînes exportées pour mesurer le chargement")
+    parser.add_argument("--mongo", action="store_true", help="mesurer aussi le chargement depuis MongoDB (MONGODB_URI)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    history = synthetic_history(args.channels, args.hours)
+    streams = synthetic_streams(args.channels, args.streams)
+    print(f"📦 {len(history):,} snapshots, {len(streams):,} streams générés en {time.perf_counter() - started:.1f} s "
+          f"({history.memory_usage(deep=True).sum() / 1e6:.0f} Mo)\n")
+
+    timed("growth_rates (24 h)", growth_rates, history, 24)
+    timed("rank_deltas", rank_deltas, history)
+    timed("latest_trends", latest_trends, history, 24 * 7)
+    timed("stream_spikes zscore", stream_spikes, streams, "zscore")
+    timed("stream_spikes iqr", stream_spikes, streams, "iqr")
+    timed("hour_of_day_performance", hour_of_day_performance, streams)
+    timed("hour_of_day (par chaîne)", hour_of_day_performance, streams, True)
+
+    subset = history[history["name"].cat.codes < args.load_channels].reset_index(drop=True)
+    print(f"\n📂 Chargement : {len(subset):,} snapshots ({args.load_channels} chaînes)")
+    try:
+        export_history(subset)
+        bench_load("parquet", 24)
+        if args.mongo:
+            insert_history(subset)
+            bench_load("mongo", 24)
+            insert_history(subset.iloc[:0])
+    finally:
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare l'écriture document par document (replace_one) et l'écriture par lots (bulk_write).
+
+    python -m benchmarks.bench_insert               # MongoDB de MONGODB_URI
+    python -m benchmarks.bench_insert --mongomock   # sans serveur (mongomock)
+"""
+import argparse
+import os
+import time
+
+from pymongo import MongoClient, ReplaceOne
+
+
+def make_profiles(n):
+    return [
+        {"name": f"streamer_{i}", "rank": i, "bio": "x" * 200, "top_games": [{"game": "Just Chatting", "hours": "120"}]}
+        for i in range(1, n + 1)
+    ]
+
+
+def bench_replace_one(collection, docs):
+    start = time.perf_counter()
+    for doc in docs:
+        collection.replace_one({"name": doc["name"]}, doc, upsert=True)
+    return time.perf_counter() - start
+
+
+def bench_bulk_write(collection, docs, chunk_size):
+    start = time.perf_counter()
+    for i in range(0, len(docs), chunk_size):
+        operations = [ReplaceOne({"name": d["name"]}, d, upsert=True) for d in docs[i:i + chunk_size]]
+        collection.bulk_write(operations, ordered=False)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=500)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--mongomock", action="store_true")
+    args = parser.parse_args()
+
+    if args.mongomock:
+        import mongomock
+        client = mongomock.MongoClient()
+    else:
+        client = MongoClient(os.getenv("MONGODB_URI"))
+    db = client["twitchtracker_bench"]
+
+    for name, run in [
+        ("replace_one", lambda c, d: bench_replace_one(c, d)),
+        ("bulk_write", lambda c, d: bench_bulk_write(c, d, args.chunk_size)),
+    ]:
+        collection = db[f"bench_{name}"]
+        collection.drop()
+        collection.create_index("name", unique=True)
+        docs = make_profiles(args.n)
+        first = run(collection, [dict(d) for d in docs])
+        second = run(collection, [dict(d) for d in docs])
+        print(f"{name:12s} insertion: {first * 1000:8.1f} ms   mise à jour: {second * 1000:8.1f} ms")
+        collection.drop()
+
+
+if __name__ == "__main__":
+    main()
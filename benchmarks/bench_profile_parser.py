@@ -0,0 +1,51 @@
+"""
+Temps de parsing par page profil : BeautifulSoup (html.parser) vs lxml sélectif.
+Vérifie aussi que les deux chemins produisent exactement les mêmes dicts.
+
+    python -m benchmarks.bench_profile_parser pages/*.html [pages/*.html.gz]
+"""
+import argparse
+import gzip
+import time
+
+from scraper.profiles import extract_profile_sections_bs4, extract_profile_sections_lxml
+
+
+def read_page(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return f.read()
+
+
+def time_parser(parse, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(html)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    totals = {"html.parser": 0.0, "lxml": 0.0}
+    for path in args.paths:
+        html = read_page(path)
+        if extract_profile_sections_bs4(html) != extract_profile_sections_lxml(html):
+            print(f"❌ {path} : résultats différents entre html.parser et lxml")
+
+        bs4_time = time_parser(extract_profile_sections_bs4, html, args.repeat)
+        lxml_time = time_parser(extract_profile_sections_lxml, html, args.repeat)
+        totals["html.parser"] += bs4_time
+        totals["lxml"] += lxml_time
+        print(f"{path:40s} html.parser {bs4_time * 1000:7.2f} ms   lxml {lxml_time * 1000:7.2f} ms   x{bs4_time / lxml_time:.1f}")
+
+    n = len(args.paths)
+    print(f"\nMoyenne par page : html.parser {totals['html.parser'] / n * 1000:.2f} ms"
+          f" — lxml {totals['lxml'] / n * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
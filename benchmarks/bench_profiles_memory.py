@@ -0,0 +1,79 @@
+"""
+Empreinte mémoire des profils côté dashboard, pour N profils synthétiques (10 000 par défaut) :
+- "documents" : l'ancien chargement, pd.DataFrame des documents MongoDB complets ;
+- "compacte" : ProfileStore (frontend/profile_store.py), table typée sans listes imbriquées.
+La mémoire retenue est mesurée avec tracemalloc (objets Python) plus les buffers Arrow.
+
+    python -m benchmarks.bench_profiles_memory --profiles 10000
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+
+import pandas as pd
+import pyarrow as pa
+
+from frontend.profile_store import SUMMARY_PROJECTION, ProfileStore
+
+GAMES = [f"Game {i}" for i in range(400)]
+LANGUAGES = ["French", "English", "Spanish", "German", "Portuguese"]
+STATS = ["followers", "total_views", "avg_viewers", "max_viewers", "hours_streamed", "games_streamed",
+         "followers_gain", "rank_global", "rank_language", "hours_watched", "active_days", "peak_day"]
+
+
+def synthetic_profile(i, rng):
+    """Document de la collection `profiles` aux ordres de grandeur réels"""
+    return {
+        "name": f"streamer_{i}",
+        "profile_url": f"https://twitchtracker.com/streamer_{i}",
+        "rank": i + 1,
+        "scraped_at": f"2026-01-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:00:00+00:00",
+        "bio": " ".join(rng.choice(["gaming", "chill", "fps", "live", "tous", "les", "soirs", "🎮"]) for _ in range(40)),
+        "channel_info": {"language": rng.choice(LANGUAGES), "created_date": "2015-06-01", "status": "Partner"},
+        "additional_stats": {key: f"{rng.randint(1, 99_999):,}" for key in STATS},
+        "top_games": [{"game": rng.choice(GAMES), "hours": rng.randint(1, 5000)} for _ in range(5)],
+        "recent_streams": [
+            {"date": f"2026-01-{day:02d} 20:00:00", "game": rng.choice(GAMES), "duration": f"{rng.randint(1, 9)}h",
+             "max_viewers": rng.randint(10, 50_000), "all_games": [rng.choice(GAMES) for _ in range(2)]}
+            for day in range(1, 11)
+        ],
+    }
+
+
+def retained(build, count):
+    """Mémoire (octets) retenue par le résultat de `build(documents)`, documents source libérés"""
+    gc.collect()
+    tracemalloc.start()
+    arrow_before = pa.total_allocated_bytes()
+    rng = random.Random(0)
+    result = build([synthetic_profile(i, rng) for i in range(count)])
+    gc.collect()
+    python_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, python_bytes + pa.total_allocated_bytes() - arrow_before
+
+
+def project(doc):
+    return {key: doc[key] for key in SUMMARY_PROJECTION if key in doc}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", type=int, default=10_000)
+    args = parser.parse_args()
+    scale = 10_000 / args.profiles
+
+    documents, documents_bytes = retained(pd.DataFrame, args.profiles)
+    del documents
+    store, store_bytes = retained(lambda docs: ProfileStore.from_documents([project(doc) for doc in docs]), args.profiles)
+
+    print(f"📦 {args.profiles:,} profils — mémoire pour 10 000 profils :")
+    print(f"  documents (DataFrame object) {documents_bytes * scale / 1e6:8.1f} Mo")
+    print(f"  compacte (ProfileStore)      {store_bytes * scale / 1e6:8.1f} Mo "
+          f"(dont tables : {store.memory_usage() * scale / 1e6:.1f} Mo)")
+    print(f"  gain                         {documents_bytes / store_bytes:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
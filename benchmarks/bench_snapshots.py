@@ -0,0 +1,61 @@
+"""
+Débit d'ingestion et de requêtes d'historique sur les collections de snapshots.
+À lancer sur une base MongoDB jetable (MONGODB_URI) : crée puis supprime `twitchtracker_bench`.
+
+    python -m benchmarks.bench_snapshots --channels 5000 --hours 200
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import db.snapshots as snapshots
+from db.mongo_client import get_client
+
+BENCH_DB = "twitchtracker_bench"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--channels", type=int, default=5000)
+    parser.add_argument("--hours", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ["MONGODB_DB"] = BENCH_DB
+    get_client().drop_database(BENCH_DB)
+    snapshots.ensure_snapshot_collections()
+
+    start_time = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    total_rows = args.channels * args.hours
+    started = time.perf_counter()
+    for hour in range(args.hours):
+        scraped_at = (start_time + timedelta(hours=hour)).isoformat()
+        rows = [
+            {
+                "name": f"streamer_{i}", "rank": i + 1, "scraped_at": scraped_at,
+                "avg_viewers": f"{random.randint(100, 90000):,}", "followers_gain": f"+{random.randint(0, 5000)}",
+                "total_followers": f"{random.randint(1, 900) / 10}K", "hours_streamed": str(random.randint(1, 300)),
+            }
+            for i in range(args.channels)
+        ]
+        snapshots._insert_snapshots(snapshots.RANKING_SNAPSHOTS, (snapshots.ranking_snapshot(r, "fr") for r in rows))
+    elapsed = time.perf_counter() - started
+    print(f"Ingestion : {total_rows} lignes en {elapsed:.1f}s ({total_rows / elapsed:,.0f} lignes/s)")
+
+    started = time.perf_counter()
+    returned = 0
+    for _ in range(args.queries):
+        name = f"streamer_{random.randrange(args.channels)}"
+        window_start = start_time + timedelta(hours=random.randrange(args.hours))
+        returned += len(snapshots.get_channel_history(name, window_start, window_start + timedelta(days=7)))
+    elapsed = time.perf_counter() - started
+    print(f"Historique : {args.queries} requêtes en {elapsed:.2f}s "
+          f"({elapsed / args.queries * 1000:.2f} ms/requête, {returned} lignes)")
+
+    get_client().drop_database(BENCH_DB)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Suite de benchmarks sur le corpus de fixtures (voir benchmarks/fixtures.py), sans accès au site :
+- chaque extracteur profil, en BeautifulSoup (extract_*) et en lxml (_lxml_*), plus la page complète ;
+- le parsing des lignes de classement (parse_ranking_page) ;
+- le débit de bout en bout contre le serveur de rejeu (pages/s de classement, profils/s).
+
+Les résultats sont comparés à benchmarks/baseline.json ; une dérive au-delà de `--tolerance`
+est signalée et le code de sortie vaut 1.
+
+    python -m benchmarks.bench_suite                    # compare à la baseline
+    python -m benchmarks.bench_suite --save-baseline    # enregistre la baseline
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import time
+
+# Le cache HTTP fausserait le débit de bout en bout : on mesure le rejeu, pas le disque
+os.environ["TWITCHTRACKER_HTTP_CACHE"] = "0"
+
+from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+
+import scraper.profiles as profiles
+from benchmarks.fixtures import FIXTURES_DIR, iter_fixtures
+from benchmarks.replay import ReplayServer
+from scraper.rankings import LEADERBOARDS, parse_ranking_page, scrape_ranking
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+MIN_PASS_SECONDS = 0.05
+FIELDS = ("bio", "top_games", "recent_streams", "additional_stats", "channel_info")
+
+
+def per_call_ms(func, args_list, repeat):
+    """
+    Meilleur temps moyen d'un appel (ms) sur `repeat` passes (comme timeit). Chaque passe rejoue tous
+    les arguments autant de fois que nécessaire pour durer au moins MIN_PASS_SECONDS : les extracteurs
+    de quelques microsecondes ne sont pas dominés par le bruit de la machine.
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            for args in args_list:
+                func(*args)
+        if time.perf_counter() - start >= MIN_PASS_SECONDS:
+            break
+        loops *= 2
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            for args in args_list:
+                func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best / (len(args_list) * loops) * 1000
+
+
+def bench_profile_extractors(pages, repeat):
+    results = {}
+    soups = [(BeautifulSoup(html, "html.parser"),) for html in pages]
+    sections = [(profiles._collect_sections(lxml_html.fromstring(html.encode("utf-8"))),) for html in pages]
+    for field in FIELDS:
+        results[f"profile.{field}.bs4"] = per_call_ms(getattr(profiles, f"extract_{field}"), soups, repeat)
+        results[f"profile.{field}.lxml"] = per_call_ms(getattr(profiles, f"_lxml_{field}"), sections, repeat)
+    results["profile.page.bs4"] = per_call_ms(profiles.extract_profile_sections_bs4, [(html,) for html in pages], repeat)
+    results["profile.page.lxml"] = per_call_ms(profiles.extract_profile_sections_lxml, [(html,) for html in pages], repeat)
+    return {name: (value, "ms") for name, value in results.items()}
+
+
+def bench_ranking_parser(entries, repeat):
+    args = [(html, entry["page"], LEADERBOARDS[entry["leaderboard"]]["region"]) for entry, html in entries]
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = sum(len(parse_ranking_page(*item)[0]) for item in args)
+        page_ms = per_call_ms(parse_ranking_page, args, repeat)
+    return {
+        "ranking.page": (page_ms, "ms"),
+        "ranking.row": (page_ms * len(args) / max(rows, 1), "ms"),
+    }
+
+
+def bench_end_to_end(ranking_entries, profile_entries, directory, workers):
+    results = {}
+    boards = {}
+    for entry, _ in ranking_entries:
+        boards[entry["leaderboard"]] = max(boards.get(entry["leaderboard"], 0), entry["page"])
+
+    with ReplayServer(directory) as server, contextlib.redirect_stdout(io.StringIO()):
+        if boards:
+            start = time.perf_counter()
+            for key, pages in boards.items():
+                # Profondeur = toutes les pages enregistrées
+                scrape_ranking(key, depth=pages * 50, workers=workers, rate=1e6, site_url=server.url)
+            elapsed = time.perf_counter() - start
+            results["pipeline.ranking_pages"] = (sum(boards.values()) / elapsed, "pages/s")
+
+        if profile_entries:
+            streamers = [
+                {"name": entry["name"], "rank": entry.get("rank"), "profile_url": f"{server.url}{path}"}
+                for path, entry in profile_entries
+            ]
+            start = time.perf_counter()
+            scraped = profiles.scrape_profiles(streamers, workers=workers, rate=1e6)
+            elapsed = time.perf_counter() - start
+            results["pipeline.profiles"] = (len(scraped) / elapsed, "profiles/s")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Affiche chaque mesure face à la baseline ; renvoie la liste des régressions"""
+    regressions = []
+    for name, (value, unit) in results.items():
+        reference = baseline.get(name, {}).get("value")
+        if not reference:
+            print(f"  {name:32s} {value:10.3f} {unit:11s}")
+            continue
+        # ms : plus bas = mieux ; pages/s, profils/s : plus haut = mieux
+        ratio = value / reference if unit == "ms" else reference / value
+        flag = "❌" if ratio > 1 + tolerance else "✅"
+        print(f"  {name:32s} {value:10.3f} {unit:11s} baseline {reference:10.3f}  x{ratio:.2f} {flag}")
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="dérive tolérée (0.2 = 20 %%)")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    ranking_entries = [(entry, html) for _, entry, html in iter_fixtures("ranking", args.fixtures)]
+    profile_fixtures = list(iter_fixtures("profile", args.fixtures))
+    if not ranking_entries and not profile_fixtures:
+        print(f"❌ Aucun fixture dans {args.fixtures} (python -m benchmarks.record_fixtures)")
+        return 1
+
+    logging.disable(logging.WARNING)
+    print(f"🎞️ Corpus : {len(ranking_entries)} pages de classement, {len(profile_fixtures)} profils\n")
+    results = {}
+    if profile_fixtures:
+        results.update(bench_profile_extractors([html for _, _, html in profile_fixtures], args.repeat))
+    if ranking_entries:
+        results.update(bench_ranking_parser(ranking_entries, args.repeat))
+    results.update(bench_end_to_end(
+        ranking_entries, [(path, entry) for path, entry, _ in profile_fixtures], args.fixtures, args.workers
+    ))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({name: {"value": value, "unit": unit} for name, (value, unit) in results.items()},
+                      f, indent=2, sort_keys=True)
+        compare(results, {}, args.tolerance)
+        print(f"\n💾 Baseline enregistrée : {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = {}
+        print("⚠️ Pas de baseline (--save-baseline pour en créer une)\n")
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} régression(s) au-delà de {args.tolerance:.0%} : {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,60 @@
+"""
+Corpus de pages TwitchTracker enregistrées (classements et profils), gzippées sur disque.
+`manifest.json` associe chaque chemin d'URL (requête comprise) à son fichier :
+
+    {"/channels/viewership/french?page=2": {"file": "...", "kind": "ranking", "leaderboard": "fr", "page": 2},
+     "/zerator": {"file": "zerator.html.gz", "kind": "profile", "name": "zerator", "rank": 1}}
+
+Enregistrement : python -m benchmarks.record_fixtures ; rejeu : python -m benchmarks.replay
+"""
+import gzip
+import json
+import os
+import re
+
+FIXTURES_DIR = os.getenv("TWITCHTRACKER_FIXTURES_DIR", os.path.join(os.path.dirname(__file__), "fixtures"))
+MANIFEST = "manifest.json"
+
+
+def fixture_filename(path):
+    """Nom de fichier lisible pour un chemin d'URL ("/channels/viewership/french?page=2" -> "channels__viewership__french__p2.html.gz")"""
+    path, _, query = path.partition("?")
+    name = path.strip("/").replace("/", "__") or "index"
+    page = re.search(r"page=(\d+)", query)
+    if page:
+        name = f"{name}__p{page.group(1)}"
+    return re.sub(r"[^\w.-]", "_", name) + ".html.gz"
+
+
+def load_manifest(directory=FIXTURES_DIR):
+    try:
+        with open(os.path.join(directory, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest, directory=FIXTURES_DIR):
+    with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def save_fixture(manifest, path, html, directory=FIXTURES_DIR, **meta):
+    """Écrit une page gzippée et l'ajoute au manifest (sauvegardé par l'appelant)"""
+    os.makedirs(directory, exist_ok=True)
+    filename = fixture_filename(path)
+    with gzip.open(os.path.join(directory, filename), "wt", encoding="utf-8") as f:
+        f.write(html)
+    manifest[path] = {"file": filename, **meta}
+
+
+def read_fixture(entry, directory=FIXTURES_DIR):
+    with gzip.open(os.path.join(directory, entry["file"]), "rt", encoding="utf-8") as f:
+        return f.read()
+
+
+def iter_fixtures(kind, directory=FIXTURES_DIR):
+    """(chemin, métadonnées, HTML) de chaque page `kind` ("ranking" ou "profile") du corpus"""
+    for path, entry in sorted(load_manifest(directory).items()):
+        if entry.get("kind") == kind:
+            yield path, entry, read_fixture(entry, directory)
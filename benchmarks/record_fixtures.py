@@ -0,0 +1,55 @@
+"""
+Enregistre un corpus de pages réelles pour le rejeu hors ligne et les benchmarks :
+les `--pages` premières pages de chaque classement et les profils des `--profiles` premiers streamers.
+
+    python -m benchmarks.record_fixtures --leaderboards fr world --pages 2 --profiles 25
+"""
+import argparse
+
+from benchmarks.fixtures import FIXTURES_DIR, load_manifest, save_fixture, save_manifest
+from scraper.pool import HostRateLimiter
+from scraper.rankings import HEADERS, LEADERBOARDS, SITE_URL, page_url, parse_ranking_page
+from scraper.retry import call_with_retries, limited_fetch
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leaderboards", nargs="+", choices=sorted(LEADERBOARDS), default=["fr", "world"])
+    parser.add_argument("--pages", type=int, default=2, help="pages enregistrées par classement")
+    parser.add_argument("--profiles", type=int, default=25, help="profils enregistrés par classement")
+    parser.add_argument("--rate", type=float, default=1.0)
+    parser.add_argument("--output", default=FIXTURES_DIR)
+    args = parser.parse_args()
+
+    rate_limiter = HostRateLimiter(args.rate)
+    manifest = load_manifest(args.output)
+
+    def fetch(path):
+        url = f"{SITE_URL}{path}"
+        return call_with_retries(lambda: limited_fetch(url, headers=HEADERS, rate_limiter=rate_limiter), label=path)
+
+    for key in args.leaderboards:
+        board = LEADERBOARDS[key]
+        streamers = []
+        for page in range(1, args.pages + 1):
+            path = page_url(board["path"], page)
+            html = fetch(path)
+            save_fixture(manifest, path, html, args.output, kind="ranking", leaderboard=key, page=page)
+            rows, _, _ = parse_ranking_page(html, page, board["region"])
+            streamers.extend(rows)
+            print(f"📄 {path} : {len(rows)} lignes")
+
+        for streamer in streamers[:args.profiles]:
+            path = streamer["profile_url"][len(SITE_URL):]
+            if path in manifest:
+                continue
+            save_fixture(manifest, path, fetch(path), args.output,
+                         kind="profile", name=streamer["name"], rank=streamer["rank"])
+            print(f"👤 {path}")
+        save_manifest(manifest, args.output)
+
+    print(f"\n✅ {len(manifest)} pages dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Serveur HTTP local qui rejoue le corpus de fixtures aux mêmes chemins que TwitchTracker.
+Tous les scrapers lisent TWITCHTRACKER_SITE_URL : il suffit de la faire pointer sur le serveur.
+La commande lancée écrit dans une base jetable (MONGODB_DB, --db), jamais dans la base de production.
+
+    python -m benchmarks.replay --port 8765               # sert le corpus jusqu'à Ctrl+C
+    python -m benchmarks.replay -- python main.py all --regions fr
+                                                          # lance une commande contre le corpus
+"""
+import argparse
+import gzip
+import http.server
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.fixtures import FIXTURES_DIR, load_manifest
+
+REPLAY_DB = "twitchtracker_replay"
+
+
+class ReplayServer:
+    """
+    Sert les pages du manifest (404 pour les autres), avec une latence simulée optionnelle.
+    S'utilise comme context manager : `with ReplayServer() as server: server.url`.
+    """
+
+    def __init__(self, directory=FIXTURES_DIR, host="127.0.0.1", port=0, latency=0.0):
+        self.directory = directory
+        self.latency = latency
+        self.pages = {}
+        for path, entry in load_manifest(directory).items():
+            with open(os.path.join(directory, entry["file"]), "rb") as f:
+                self.pages[path] = gzip.decompress(f.read())
+        self.httpd = http.server.ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                body = server.pages.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="latence simulée par requête (s)")
+    parser.add_argument("--db", default=REPLAY_DB, help="base MongoDB de la commande rejouée")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="commande à lancer contre le corpus")
+    args = parser.parse_args()
+
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    with ReplayServer(args.fixtures, port=args.port, latency=args.latency) as server:
+        print(f"🎞️ {len(server.pages)} pages rejouées sur {server.url}")
+        if not command:
+            try:
+                server.thread.join()
+            except KeyboardInterrupt:
+                pass
+            return 0
+        # Pas de cache HTTP : les pages doivent venir du corpus, pas d'un run précédent.
+        # Base jetable : les classements et profils rejoués (URLs en 127.0.0.1) ne touchent pas la production.
+        env = {**os.environ, "TWITCHTRACKER_SITE_URL": server.url, "TWITCHTRACKER_HTTP_CACHE": "0",
+               "MONGODB_DB": args.db}
+        print(f"🗄️ Base MongoDB du rejeu : {args.db}")
+        return subprocess.call(command, env=env)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
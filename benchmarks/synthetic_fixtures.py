@@ -0,0 +1,143 @@
+"""
+Génère un corpus synthétique (benchmarks/fixtures/) aux gabarits des pages TwitchTracker : classements
+paginés (en-tête, lignes de pub, pagination) et profils (bio, jeux, streams, statistiques), avec le
+poids d'une vraie page (navigation, scripts, pied de page). Noms et chiffres sont inventés mais
+déterministes : le corpus versionné sert au rejeu hors ligne et à la baseline de bench_suite,
+sans dépendre du site ni publier de données réelles.
+
+    python -m benchmarks.synthetic_fixtures --leaderboards fr world --pages 2 --profiles 10
+"""
+import argparse
+import os
+import random
+
+from benchmarks.fixtures import FIXTURES_DIR, MANIFEST, save_fixture, save_manifest
+from scraper.rankings import LEADERBOARDS, ROWS_PER_PAGE, page_url
+
+GAMES = ["Just Chatting", "League of Legends", "Valorant", "Grand Theft Auto V", "Minecraft", "Fortnite",
+         "Counter-Strike", "Teamfight Tactics", "World of Warcraft", "Rocket League", "Apex Legends", "Slots"]
+LANGUAGES = {"fr": "French", "world": "English"}
+ANNOUNCED_PAGES = 20
+WORDS = ["live", "tous", "les", "soirs", "gaming", "chill", "fps", "rp", "tournois", "&amp;", "🎮", "bienvenue"]
+
+
+def layout(title, body, rng):
+    """Gabarit commun : head avec scripts, barre de navigation, pied de page"""
+    scripts = "".join(
+        f'<script>window.dataLayer=window.dataLayer||[];dataLayer.push({{"slot":{i},"v":"{rng.getrandbits(64):x}"}});</script>'
+        for i in range(12)
+    )
+    nav = "".join(f'<li><a href="/games/{i}">{game}</a></li>' for i, game in enumerate(GAMES))
+    footer = "".join(f'<p class="small">{" ".join(rng.choice(WORDS) for _ in range(30))}</p>' for _ in range(8))
+    return (
+        f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>{title} - TwitchTracker</title>'
+        f'<link rel="stylesheet" href="/css/app.css">{scripts}</head><body>'
+        f'<nav class="navbar"><ul class="nav navbar-nav">{nav}</ul></nav>'
+        f'<div class="container">{body}</div><footer>{footer}</footer></body></html>'
+    )
+
+
+def streamer_name(key, rank):
+    return f"{key}_streamer_{rank:03d}"
+
+
+def ranking_page(key, page, rng):
+    rows = []
+    for rank in range((page - 1) * ROWS_PER_PAGE + 1, page * ROWS_PER_PAGE + 1):
+        name = streamer_name(key, rank)
+        viewers = int(60_000 / rank ** 0.8) + rng.randint(0, 300)
+        rows.append(
+            f'<tr><td class="ranking">#{rank}</td>'
+            f'<td><a href="/{name}"><img src="https://static-cdn.example/{name}-70x70.png" class="img-rounded"></a></td>'
+            f'<td><a href="/{name}">{name}</a></td>'
+            f'<td><span class="color-viewers">{viewers:,}</span></td>'
+            f'<td><span>{rng.randint(20, 400)}</span> hours</td>'
+            f'<td><span>{viewers * rng.randint(2, 6):,}</span></td>'
+            f'<td>{viewers * rng.randint(1_000, 9_000):,}</td>'
+            f'<td>{rank + rng.randint(0, 5_000)}</td>'
+            f'<td>+{rng.randint(100, 90_000):,}</td>'
+            f'<td>{rng.randint(10, 9_000) / 10:.1f}K</td>'
+            f'<td>{rng.randint(1, 900) / 10:.1f}M</td></tr>'
+        )
+        if rank % 25 == 10:
+            rows.append('<tr class="ad"><td colspan="11"><div class="ad-slot" data-slot="ranking"></div></td></tr>')
+    head = "".join(f"<th>{label}</th>" for label in (
+        "#", "", "Channel", "Avg viewers", "Time", "Peak", "Hours watched", "Rank", "Followers", "Total", "Views"))
+    pagination = "".join(f'<li><a href="?page={i}">{i}</a></li>' for i in range(1, ANNOUNCED_PAGES + 1))
+    body = (f'<h1>Most watched channels</h1><table class="table table-striped" id="channels"><thead><tr>{head}</tr></thead>'
+            f'<tbody>{"".join(rows)}</tbody></table><ul class="pagination">{pagination}</ul>')
+    return layout("Channels", body, rng)
+
+
+def stream_games(rng):
+    return "".join(f'<img title="{game}" src="/g.png">' for game in rng.sample(GAMES, rng.randint(1, 3)))
+
+
+def profile_page(key, rank, rng):
+    name = streamer_name(key, rank)
+    games = "".join(
+        f'<a class="entity" href="/games/{i}"><div class="entity-img" title="{game}"><img src="/g{i}.png"></div>'
+        f'<div><span class="to-time">{rng.randint(10, 4_000)}</span> hours</div></a>'
+        for i, game in enumerate(rng.sample(GAMES, 6))
+    )
+    streams = "".join(
+        f'<a class="entity-line" href="/{name}/streams/{rng.getrandbits(40)}">'
+        f'<div data-dt="2026-01-{day:02d} {rng.randint(12, 22)}:00:00"></div>'
+        f'<div class="to-number-lg">{rng.randint(500, 90_000):,}</div><div class="to-number-lg">{rng.randint(100, 20_000):,}</div>'
+        f'<div class="to-time-lg">{rng.randint(1, 9)}h {rng.randint(0, 59)}m</div>'
+        f'<div>{stream_games(rng)}</div></a>'
+        for day in range(1, 13)
+    )
+    blocks = "".join(
+        f'<div class="g-x-s-block"><div class="to-number">{rng.randint(1, 999):,}{rng.choice(["", "K", "M"])}</div>'
+        f'<div class="g-x-s-label">{label}</div></div>'
+        for label in ("Avg viewers", "Hours streamed", "Followers gained", "Peak viewers", "Hours watched", "Active days")
+    )
+    table = '<table class="table table-condensed"><tbody>' + "".join(
+        f'<tr><td>{label}:</td><td>{rng.randint(1, 99_999):,}</td></tr>'
+        for label in ("Followers", "Total views", "Rank", "Language rank")
+    ) + "</tbody></table>"
+    language = LANGUAGES.get(key, "English")
+    profile = (f'<div class="panel"><div class="panel-heading"><div>Streamer Profile</div></div>'
+               f'<div class="panel-body"><a href="/languages/{language}">{language}</a> '
+               f'<span class="to-date">20{rng.randint(11, 22)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}</span> '
+               f'<span class="label label-soft">{rng.choice(["Partner", "Affiliate"])}</span></div></div>')
+    bio = (f'<div style="margin:0;word-wrap:break-word">{" ".join(rng.choice(WORDS) for _ in range(40))} '
+           f'<a href="/cdn-cgi/l/email-protection">[email&#160;protected]</a></div>')
+    body = (f'<h1>{name}</h1>{profile}{bio}<div id="channel-games">{games}</div>'
+            f'<div id="channel-streams">{streams}</div><div class="g-x-s">{blocks}</div>{table}')
+    return layout(name, body, rng)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leaderboards", nargs="+", choices=sorted(LEADERBOARDS), default=["fr", "world"])
+    parser.add_argument("--pages", type=int, default=2, help="pages générées par classement")
+    parser.add_argument("--profiles", type=int, default=10, help="profils générés par classement")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=FIXTURES_DIR)
+    args = parser.parse_args()
+
+    # Corpus régénéré entièrement : pas de fichiers orphelins d'un précédent manifest
+    if os.path.isdir(args.output):
+        for filename in os.listdir(args.output):
+            if filename.endswith(".html.gz") or filename == MANIFEST:
+                os.remove(os.path.join(args.output, filename))
+
+    rng = random.Random(args.seed)
+    manifest = {}
+    for key in args.leaderboards:
+        path = LEADERBOARDS[key]["path"]
+        for page in range(1, args.pages + 1):
+            save_fixture(manifest, page_url(path, page), ranking_page(key, page, rng), args.output,
+                         kind="ranking", leaderboard=key, page=page)
+        for rank in range(1, args.profiles + 1):
+            name = streamer_name(key, rank)
+            save_fixture(manifest, f"/{name}", profile_page(key, rank, rng), args.output,
+                         kind="profile", name=name, rank=rank)
+    save_manifest(manifest, args.output)
+    print(f"✅ {len(manifest)} pages synthétiques dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import threading
+from datetime import datetime, timezone
+
+from pymongo import DeleteMany, ReplaceOne
+
+from db.mongo_client import get_db
+from db.versions import bump_data_version
+from scraper.metrics import METRICS
+from scraper.numbers import parse_duration, parse_number
+
+# Une ligne par (jeu, chaîne) : agrégats des derniers streams de la chaîne sur ce jeu
+GAME_CHANNELS = "game_channels"
+# Une ligne par jeu : totaux sur toutes les chaînes, recalculés pour les jeux touchés par un lot de profils
+GAMES = "games"
+UNKNOWN_GAMES = ("Unknown", "", None)
+# Les jobs FR et Monde écrivent en parallèle : écriture + recalcul des totaux sérialisés
+_LOCK = threading.Lock()
+
+
+def ensure_game_indexes():
+    get_db()[GAME_CHANNELS].create_index([("game", 1), ("name", 1)], unique=True)
+    get_db()[GAME_CHANNELS].create_index([("game", 1), ("language", 1), ("hours", -1)])
+    get_db()[GAME_CHANNELS].create_index("name")
+    get_db()[GAMES].create_index("game", unique=True)
+    get_db()[GAMES].create_index([("hours", -1)])
+
+
+def channel_game_rows(doc):
+    """
+    Agrège les streams récents d'un profil par jeu. Un stream multi-jeux (`all_games`) compte
+    pour chacun de ses jeux, sa durée étant répartie à parts égales entre eux.
+    """
+    by_game = {}
+    for stream in doc.get("recent_streams") or []:
+        games = [game for game in stream.get("all_games") or [stream.get("game")] if game not in UNKNOWN_GAMES]
+        if not games:
+            continue
+        hours = (parse_duration(stream.get("duration")) or 0.0) / len(games)
+        viewers = parse_number(stream.get("max_viewers")) or 0
+        for game in dict.fromkeys(games):
+            row = by_game.setdefault(game, {
+                "game": game,
+                "name": doc.get("name"),
+                "language": (doc.get("channel_info") or {}).get("language") or "Unknown",
+                "profile_url": doc.get("profile_url"),
+                "streams": 0,
+                "hours": 0.0,
+                "peak_viewers": 0,
+                "viewers_sum": 0,
+                "last_stream": None,
+            })
+            row["streams"] += 1
+            row["hours"] += hours
+            row["peak_viewers"] = max(row["peak_viewers"], viewers)
+            row["viewers_sum"] += viewers
+            if stream.get("date") and stream["date"] != "N/A":
+                row["last_stream"] = max(row["last_stream"] or "", stream["date"])
+    for row in by_game.values():
+        row["hours"] = round(row["hours"], 2)
+        row["avg_viewers"] = round(row["viewers_sum"] / row["streams"], 1)
+    return list(by_game.values())
+
+
+def refresh_game_totals(games):
+    """Recalcule les totaux de `games` à partir de game_channels (agrégation MongoDB par jeu et langue)"""
+    games = list(games)
+    if not games:
+        return 0
+    groups = get_db()[GAME_CHANNELS].aggregate([
+        {"$match": {"game": {"$in": games}}},
+        {"$group": {
+            "_id": {"game": "$game", "language": "$language"},
+            "channels": {"$sum": 1},
+            "streams": {"$sum": "$streams"},
+            "hours": {"$sum": "$hours"},
+            "peak_viewers": {"$max": "$peak_viewers"},
+            "viewers_sum": {"$sum": "$viewers_sum"},
+        }},
+    ])
+
+    now = datetime.now(timezone.utc)
+    totals = {}
+    for group in groups:
+        game = group["_id"]["game"]
+        total = totals.setdefault(game, {
+            "game": game, "channels": 0, "streams": 0, "hours": 0.0, "peak_viewers": 0,
+            "viewers_sum": 0, "languages": {}, "updated_at": now,
+        })
+        total["channels"] += group["channels"]
+        total["streams"] += group["streams"]
+        total["hours"] += group["hours"]
+        total["peak_viewers"] = max(total["peak_viewers"], group["peak_viewers"])
+        total["viewers_sum"] += group["viewers_sum"]
+        total["languages"][group["_id"]["language"]] = group["channels"]
+
+    operations = []
+    for game in games:
+        total = totals.get(game)
+        if total is None:
+            operations.append(DeleteMany({"game": game}))
+            continue
+        total["hours"] = round(total["hours"], 2)
+        total["avg_viewers"] = round(total.pop("viewers_sum") / total["streams"], 1) if total["streams"] else 0
+        operations.append(ReplaceOne({"game": game}, total, upsert=True))
+    get_db()[GAMES].bulk_write(operations, ordered=False)
+    return len(totals)
+
+
+def update_game_channels(data, touched):
+    """
+    Remplace les lignes (jeu, chaîne) d'un lot de profils qui vient d'être inséré et supprime celles
+    des jeux que ces chaînes ne streament plus. Les jeux concernés sont ajoutés à `touched` : leurs
+    totaux sont recalculés une seule fois en fin de run (refresh_touched_games).
+    """
+    try:
+        data = [doc for doc in data if doc.get("name")]
+        if not data:
+            return True
+        collection = get_db()[GAME_CHANNELS]
+        operations = []
+        games = set()
+        for doc in data:
+            rows = channel_game_rows(doc)
+            operations.append(DeleteMany({"name": doc["name"], "game": {"$nin": [row["game"] for row in rows]}}))
+            operations.extend(ReplaceOne({"game": row["game"], "name": row["name"]}, row, upsert=True) for row in rows)
+            games.update(row["game"] for row in rows)
+
+        names = [doc["name"] for doc in data]
+        with _LOCK, METRICS.timer("db_write", collection=GAME_CHANNELS):
+            # Jeux que ces chaînes streamaient avant le lot : leurs totaux changent aussi
+            games.update(row["game"] for row in collection.find({"name": {"$in": names}}, {"_id": 0, "game": 1}))
+            collection.bulk_write(operations, ordered=False)
+        touched.update(games)
+        return True
+    except Exception as e:
+        METRICS.inc("db_errors", collection=GAME_CHANNELS)
+        print(f"❌ Erreur MongoDB (index par jeu): {e}")
+        return False
+
+
+def refresh_touched_games(touched):
+    """Recalcule les totaux des jeux touchés pendant le run ; le coût dépend du run, pas du nombre total de profils"""
+    try:
+        with _LOCK, METRICS.timer("db_write", collection=GAMES):
+            games = refresh_game_totals(touched)
+        METRICS.inc("db_documents", len(touched), collection=GAMES, op="refreshed")
+        print(f"🎮 Index par jeu : {games} jeux mis à jour")
+        return True
+    except Exception as e:
+        METRICS.inc("db_errors", collection=GAMES)
+        print(f"❌ Erreur MongoDB (totaux par jeu): {e}")
+        return False
+
+
+def rebuild_game_index(chunk_size=500):
+    """Reconstruit l'index par jeu depuis la collection profiles (profils antérieurs à l'index)"""
+    ensure_game_indexes()
+    batch = []
+    touched = set()
+    projection = {"_id": 0, "name": 1, "profile_url": 1, "channel_info": 1, "recent_streams": 1}
+    for doc in get_db()["profiles"].find({}, projection).batch_size(chunk_size):
+        batch.append(doc)
+        if len(batch) >= chunk_size:
+            if not update_game_channels(batch, touched):
+                return False
+            batch = []
+    if not update_game_channels(batch, touched) or not refresh_touched_games(touched):
+        return False
+    bump_data_version(GAMES)
+    return True
+
+
+def get_games(language=None, exclude_language=None, limit=500):
+    """
+    Jeux de l'index triés par heures de stream : streamés par au moins une chaîne de `language`,
+    ou par au moins une chaîne d'une autre langue que `exclude_language`.
+    """
+    query = {}
+    if language:
+        query[f"languages.{language}"] = {"$gt": 0}
+    if exclude_language:
+        query["$expr"] = {"$gt": ["$channels", {"$ifNull": [f"$languages.{exclude_language}", 0]}]}
+    projection = {"_id": 0, "game": 1, "channels": 1, "hours": 1, "peak_viewers": 1, "avg_viewers": 1}
+    return list(get_db()[GAMES].find(query, projection).sort("hours", -1).limit(limit))
+
+
+def get_game_channels(game, language=None, limit=100, exclude_language=None):
+    """Chaînes qui streament `game` (de langue `language`, ou hors `exclude_language`), triées par heures de stream"""
+    query = {"game": game}
+    if language:
+        query["language"] = language
+    elif exclude_language:
+        query["language"] = {"$ne": exclude_language}
+    cursor = get_db()[GAME_CHANNELS].find(query, {"_id": 0, "viewers_sum": 0}).sort("hours", -1).limit(limit)
+    return list(cursor)
@@ -1,37 +1,122 @@
-from db.mongo_client import db
+from pymongo import ReplaceOne
+from db.mongo_client import get_db
+from scraper.metrics import METRICS
+from scraper.rankings import LEADERBOARDS
+from db.summaries import insert_ranking_summary
+from db.versions import bump_data_version
+from db.games import ensure_game_indexes, refresh_touched_games, update_game_channels
+from db.snapshots import ensure_snapshot_collections, insert_profile_snapshots, insert_ranking_snapshots
 
-def insert_data(collection_name, data, label=None):
-    """Insère ou met à jour des documents dans MongoDB (par nom)"""
+BULK_CHUNK_SIZE = 500
+# Index utilisés par le tri et les filtres du dashboard
+RANKING_INDEXES = ("rank", "avg_viewers", "total_followers")
+
+# Classement (clé de LEADERBOARDS) -> (collection, libellé des messages)
+RANKING_TARGETS = {
+    key: (f"viewership_{key}", f"streamers du classement '{key}'") for key in LEADERBOARDS
+}
+RANKING_TARGETS["fr"] = ("viewership_fr", "streamers français")
+RANKING_TARGETS["world"] = ("viewership_world", "streamers du Top 500 mondial")
+
+def ensure_indexes(regions=("fr", "world")):
+    """
+    Crée les index des classements de `regions` et des profils :
+    `name` unique (upserts indexés) et index de tri/filtre du dashboard
+    """
+    try:
+        ranking_collections = [RANKING_TARGETS[region][0] for region in regions]
+        for collection_name in (*ranking_collections, "profiles"):
+            get_db()[collection_name].create_index("name", unique=True)
+        for collection_name in ranking_collections:
+            for field in RANKING_INDEXES:
+                get_db()[collection_name].create_index(field)
+        ensure_snapshot_collections()
+        ensure_game_indexes()
+    except Exception as e:
+        print(f"⚠️ Impossible de créer les index MongoDB : {e}")
+
+def insert_data(collection_name, data, label=None, chunk_size=BULK_CHUNK_SIZE):
+    """
+    Insère ou met à jour des documents dans MongoDB (par nom), par lots de `chunk_size`.
+    Renvoie False si l'écriture a échoué.
+    """
     try:
-        collection = db[collection_name]
+        collection = get_db()[collection_name]
         inserted_count = 0
         updated_count = 0
 
-        for doc in data:
-            result = collection.replace_one(
-                {"name": doc.get("name")},
-                doc,
-                upsert=True
-            )
-            if result.matched_count:
-                updated_count += 1
-            else:
-                inserted_count += 1
+        data = list(data)
+        for start in range(0, len(data), chunk_size):
+            operations = [
+                ReplaceOne({"name": doc.get("name")}, doc, upsert=True)
+                for doc in data[start:start + chunk_size]
+            ]
+            with METRICS.timer("db_write", collection=collection_name):
+                result = collection.bulk_write(operations, ordered=False)
+            inserted_count += result.upserted_count
+            updated_count += result.matched_count
+
+        METRICS.inc("db_documents", inserted_count, collection=collection_name, op="inserted")
+        METRICS.inc("db_documents", updated_count, collection=collection_name, op="updated")
 
         print(f"✅ {inserted_count} nouveaux {label or 'documents'} insérés")
         print(f"🔁 {updated_count} {label or 'documents'} mis à jour dans '{collection_name}'")
+        return True
 
     except Exception as e:
+        METRICS.inc("db_errors", collection=collection_name)
         print("❌ Erreur MongoDB: Impossible de se connecter à la base de données")
         print("💡 Solution: Démarrez MongoDB avec la commande 'mongod' dans un autre terminal")
         print("🔧 Ou installez MongoDB: https://www.mongodb.com/try/download/community")
         print(f"Détail de l'erreur : {e}")
+        return False
+
+def insert_ranking_batch(region, batch):
+    """Écrit un lot de lignes de classement (collection + snapshots), au fil du scraping"""
+    collection_name, label = RANKING_TARGETS[region]
+    if not insert_data(collection_name, batch, label):
+        return False
+    insert_ranking_snapshots(batch, region)
+    return True
+
+def finish_ranking_insert(region, data):
+    """Fin d'un run de classement : résumé matérialisé et nouvelle version de la collection"""
+    collection_name, _ = RANKING_TARGETS[region]
+    insert_ranking_summary(region, collection_name, data)
+    bump_data_version(collection_name)
+
+def insert_ranking_data(region, data):
+    """Classement complet d'un run : lignes puis résumé et version"""
+    if not insert_ranking_batch(region, data):
+        return False
+    finish_ranking_insert(region, data)
+    return True
 
 def insert_viewership_data(data):
-    insert_data("viewership_fr", data, "streamers français")
+    return insert_ranking_data("fr", data)
 
 def insert_viewership_world_data(data):
-    insert_data("viewership_world", data, "streamers du Top 500 mondial")
+    return insert_ranking_data("world", data)
+
+def insert_profile_batch(batch, touched_games):
+    """
+    Écrit un lot de profils (collection, snapshots, lignes de l'index par jeu), au fil du scraping.
+    `touched_games` est complété avec les jeux dont les totaux sont à recalculer en fin de run.
+    """
+    if not insert_data("profiles", batch, "profils"):
+        return False
+    insert_profile_snapshots(batch)
+    update_game_channels(batch, touched_games)
+    return True
+
+def finish_profiles_insert(touched_games):
+    """Fin d'un run de profils : totaux des jeux touchés et nouvelle version de la collection (une par run)"""
+    refresh_touched_games(touched_games)
+    bump_data_version("profiles")
 
 def insert_profiles_data(data):
-    insert_data("profiles", data, "profils")
+    touched_games = set()
+    if not insert_profile_batch(data, touched_games):
+        return False
+    finish_profiles_insert(touched_games)
+    return True
@@ -1,7 +1,60 @@
-from pymongo import MongoClient
+import importlib.util
 import os
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
-client = MongoClient(os.getenv("MONGODB_URI"))
-db = client["twitchtracker"]
\ No newline at end of file
+
+DEFAULT_DB_NAME = "twitchtracker"
+
+_client = None
+_client_lock = threading.Lock()
+
+# Compresseurs réseau par ordre de préférence, et le module Python dont chacun dépend (zlib est intégré)
+COMPRESSOR_MODULES = (("zstd", "zstandard"), ("snappy", "snappy"), ("zlib", None))
+
+
+def default_compressors():
+    """Compresseurs effectivement disponibles : pymongo avertit à chaque client pour ceux qui manquent"""
+    return ",".join(name for name, module in COMPRESSOR_MODULES
+                    if module is None or importlib.util.find_spec(module) is not None)
+
+
+def client_options():
+    """Options du pool de connexions, configurables par variables d'environnement"""
+    return {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "connectTimeoutMS": int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000")),
+        "socketTimeoutMS": int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "30000")),
+        # zstd / snappy seulement si les paquets zstandard / python-snappy sont installés
+        "compressors": os.getenv("MONGODB_COMPRESSORS") or default_compressors(),
+    }
+
+
+def get_client():
+    """
+    Client MongoDB unique du processus, créé au premier appel (et non à l'import) :
+    importer un scraper n'ouvre aucune connexion, et le pool est partagé par tous les modules.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from pymongo import MongoClient
+                _client = MongoClient(os.getenv("MONGODB_URI"), **client_options())
+    return _client
+
+
+def get_db():
+    return get_client()[os.getenv("MONGODB_DB", DEFAULT_DB_NAME)]
+
+
+def __getattr__(name):
+    # Compatibilité : `from db.mongo_client import db` reste possible mais crée le client à l'import
+    if name == "db":
+        return get_db()
+    if name == "client":
+        return get_client()
+    raise AttributeError(name)
@@ -0,0 +1,187 @@
+import os
+import threading
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+from db.mongo_client import get_db
+from db.snapshots import RANKING_NUMERIC_FIELDS, RANKING_SNAPSHOTS, _to_datetime
+from scraper.numbers import parse_number
+
+EXPORT_DIR = os.getenv("TWITCHTRACKER_EXPORT_DIR", "exports/parquet")
+# Lignes accumulées par partition avant d'écrire un record batch (borne la mémoire)
+BATCH_ROWS = 10_000
+
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+PARTITIONING = ds.partitioning(pa.schema([("region", pa.string()), ("date", pa.string())]), flavor="hive")
+
+SCHEMAS = {
+    "rankings": pa.schema(
+        [("name", pa.string()), ("scraped_at", TIMESTAMP), ("rank", pa.int32())]
+        + [(field, pa.float64()) for field in RANKING_NUMERIC_FIELDS]
+    ),
+    "profiles": pa.schema([
+        ("name", pa.string()), ("scraped_at", TIMESTAMP), ("rank", pa.int32()),
+        ("bio", pa.string()), ("language", pa.string()), ("status", pa.string()), ("created_date", pa.string()),
+        ("stats", pa.map_(pa.string(), pa.float64())),
+    ]),
+    # Tables filles : une ligne par jeu / par stream, reliées au profil par (name, scraped_at)
+    "profile_top_games": pa.schema([
+        ("name", pa.string()), ("scraped_at", TIMESTAMP), ("position", pa.int16()),
+        ("game", pa.string()), ("hours", pa.float64()),
+    ]),
+    "profile_recent_streams": pa.schema([
+        ("name", pa.string()), ("scraped_at", TIMESTAMP), ("position", pa.int16()),
+        ("started_at", pa.string()), ("game", pa.string()), ("duration", pa.string()),
+        ("max_viewers", pa.float64()), ("all_games", pa.list_(pa.string())),
+    ]),
+}
+
+
+def ranking_rows(doc):
+    row = {
+        "name": doc.get("name"),
+        "scraped_at": _to_datetime(doc.get("scraped_at")),
+        "rank": parse_number(doc.get("rank")),
+    }
+    for field in RANKING_NUMERIC_FIELDS:
+        row[field] = parse_number(doc.get(field))
+    return {"rankings": [row]}
+
+
+def profile_rows(doc):
+    """Aplatit un document profil : une ligne profil + une ligne par top game et par stream récent"""
+    name = doc.get("name")
+    scraped_at = _to_datetime(doc.get("scraped_at"))
+    info = doc.get("channel_info") or {}
+    stats = [
+        (key, number)
+        for key, number in ((key, parse_number(value)) for key, value in (doc.get("additional_stats") or {}).items())
+        if number is not None
+    ]
+    return {
+        "profiles": [{
+            "name": name, "scraped_at": scraped_at, "rank": parse_number(doc.get("rank")),
+            "bio": doc.get("bio"), "language": info.get("language"), "status": info.get("status"),
+            "created_date": info.get("created_date"), "stats": stats,
+        }],
+        "profile_top_games": [
+            {"name": name, "scraped_at": scraped_at, "position": i, "game": game.get("game"),
+             "hours": parse_number(game.get("hours"))}
+            for i, game in enumerate(doc.get("top_games") or [], start=1)
+        ],
+        "profile_recent_streams": [
+            {"name": name, "scraped_at": scraped_at, "position": i, "started_at": stream.get("date"),
+             "game": stream.get("game"), "duration": stream.get("duration"),
+             "max_viewers": parse_number(stream.get("max_viewers")), "all_games": stream.get("all_games") or []}
+            for i, stream in enumerate(doc.get("recent_streams") or [], start=1)
+        ],
+    }
+
+
+class ParquetExporter:
+    """
+    Export Parquet d'un run, partitionné à la Hive : <table>/region=<r>/date=<AAAA-MM-JJ>/<run_id>.parquet.
+    Les lignes sont bufferisées par partition et écrites par record batches de `batch_rows` :
+    la mémoire reste bornée quel que soit le volume exporté. Thread-safe (un exporteur par run,
+    partagé par les jobs). `close()` termine les fichiers et renvoie leurs chemins.
+    """
+
+    def __init__(self, run_id=None, directory=EXPORT_DIR, batch_rows=BATCH_ROWS):
+        self.run_id = run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.directory = directory
+        self.batch_rows = batch_rows
+        self.writers = {}
+        self.buffers = {}
+        self.lock = threading.Lock()
+
+    def add_rankings(self, region, docs):
+        self._add(region, docs, ranking_rows)
+
+    def add_profiles(self, region, docs):
+        self._add(region, docs, profile_rows)
+
+    def _add(self, region, docs, flatten):
+        with self.lock:
+            for doc in docs:
+                for table, rows in flatten(doc).items():
+                    for row in rows:
+                        key = (table, region, row["scraped_at"].strftime("%Y-%m-%d"))
+                        buffer = self.buffers.setdefault(key, [])
+                        buffer.append(row)
+                        if len(buffer) >= self.batch_rows:
+                            self._flush(key)
+
+    def _flush(self, key):
+        rows = self.buffers.pop(key, None)
+        if not rows:
+            return
+        table, region, date = key
+        if key not in self.writers:
+            directory = os.path.join(self.directory, table, f"region={region}", f"date={date}")
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{self.run_id}.parquet")
+            self.writers[key] = pq.ParquetWriter(path, SCHEMAS[table], compression="zstd")
+        self.writers[key].write_batch(pa.RecordBatch.from_pylist(rows, schema=SCHEMAS[table]))
+
+    def close(self):
+        with self.lock:
+            for key in list(self.buffers):
+                self._flush(key)
+            paths = []
+            for writer in self.writers.values():
+                writer.close()
+                paths.append(writer.where)
+            self.writers = {}
+        return paths
+
+
+def export_ranking_history(start=None, end=None, directory=EXPORT_DIR, batch_rows=BATCH_ROWS):
+    """
+    Rattrapage : exporte les snapshots de classement (viewership_snapshots) entre `start` et `end`
+    en lisant le curseur MongoDB par lots. Renvoie les fichiers écrits.
+    """
+    query = {}
+    if start or end:
+        query["scraped_at"] = {}
+        if start:
+            query["scraped_at"]["$gte"] = start
+        if end:
+            query["scraped_at"]["$lt"] = end
+
+    exporter = ParquetExporter(run_id=f"history-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}",
+                               directory=directory, batch_rows=batch_rows)
+    cursor = get_db()[RANKING_SNAPSHOTS].find(query, {"_id": 0}).batch_size(batch_rows)
+    by_region = {}
+    for doc in cursor:
+        region = doc.get("region") or "fr"
+        by_region.setdefault(region, []).append(doc)
+        if len(by_region[region]) >= batch_rows:
+            exporter.add_rankings(region, by_region.pop(region))
+    for region, docs in by_region.items():
+        exporter.add_rankings(region, docs)
+    return exporter.close()
+
+
+def load_table(table, regions=None, start=None, end=None, columns=None, directory=EXPORT_DIR):
+    """
+    Charge une table exportée (pyarrow.Table) avec élagage des partitions par région et date
+    (`start` / `end` : "AAAA-MM-JJ", bornes incluses). Les fichiers sont lus en mémoire mappée.
+    `.to_pandas()` sur le résultat pour un DataFrame.
+    """
+    dataset = ds.dataset(
+        os.path.abspath(os.path.join(directory, table)), format="parquet", partitioning=PARTITIONING,
+        filesystem=fs.LocalFileSystem(use_mmap=True)
+    )
+    condition = None
+    for clause in (
+        ds.field("region").isin(regions) if regions else None,
+        ds.field("date") >= start if start else None,
+        ds.field("date") <= end if end else None,
+    ):
+        if clause is not None:
+            condition = clause if condition is None else condition & clause
+    return dataset.to_table(columns=columns, filter=condition)
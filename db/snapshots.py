@@ -0,0 +1,119 @@
+from datetime import datetime, timezone
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+from db.mongo_client import get_db
+from scraper.metrics import METRICS
+from scraper.numbers import parse_number
+
+RANKING_SNAPSHOTS = "viewership_snapshots"
+PROFILE_SNAPSHOTS = "profile_snapshots"
+SNAPSHOT_CHUNK_SIZE = 1000
+
+RANKING_NUMERIC_FIELDS = (
+    "avg_viewers", "hours_streamed", "max_viewers", "total_minutes_watched",
+    "global_rank", "followers_gain", "total_followers", "total_views"
+)
+
+
+def ensure_snapshot_collections():
+    """
+    Crée les collections time-series (timeField scraped_at, metaField name)
+    et l'index composé (name, scraped_at) utilisé par les requêtes d'historique.
+    """
+    existing = set(get_db().list_collection_names())
+    for name in (RANKING_SNAPSHOTS, PROFILE_SNAPSHOTS):
+        if name not in existing:
+            try:
+                get_db().create_collection(name, timeseries={
+                    "timeField": "scraped_at",
+                    "metaField": "name",
+                    "granularity": "hours"
+                })
+            except (CollectionInvalid, OperationFailure) as e:
+                print(f"⚠️ Collection time-series '{name}' indisponible ({e}), collection classique utilisée")
+        get_db()[name].create_index([("name", 1), ("scraped_at", 1)])
+    get_db()[RANKING_SNAPSHOTS].create_index([("region", 1), ("scraped_at", 1)])
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime):
+        dt = value
+    elif value:
+        dt = datetime.fromisoformat(value)
+    else:
+        dt = datetime.now(timezone.utc)
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def ranking_snapshot(doc, region):
+    """Document de snapshot de classement : champs numériques typés, scraped_at en datetime"""
+    snapshot = {
+        "name": doc.get("name"),
+        "scraped_at": _to_datetime(doc.get("scraped_at")),
+        "region": doc.get("region") or region,
+        "rank": doc.get("rank"),
+    }
+    for field in RANKING_NUMERIC_FIELDS:
+        snapshot[field] = parse_number(doc.get(field))
+    return snapshot
+
+
+def profile_snapshot(doc):
+    """Document de snapshot de profil : statistiques numériques et derniers streams"""
+    return {
+        "name": doc.get("name"),
+        "scraped_at": _to_datetime(doc.get("scraped_at")),
+        "rank": doc.get("rank"),
+        "language": (doc.get("channel_info") or {}).get("language"),
+        "stats": {
+            key: number
+            for key, number in (
+                (key, parse_number(value)) for key, value in (doc.get("additional_stats") or {}).items()
+            )
+            if number is not None
+        },
+        "recent_streams": [
+            {**stream, "max_viewers": parse_number(stream.get("max_viewers"))}
+            for stream in doc.get("recent_streams") or []
+        ],
+    }
+
+
+def _insert_snapshots(collection_name, snapshots):
+    snapshots = list(snapshots)
+    try:
+        for start in range(0, len(snapshots), SNAPSHOT_CHUNK_SIZE):
+            with METRICS.timer("db_write", collection=collection_name):
+                get_db()[collection_name].insert_many(snapshots[start:start + SNAPSHOT_CHUNK_SIZE], ordered=False)
+        METRICS.inc("db_documents", len(snapshots), collection=collection_name, op="inserted")
+        print(f"🕒 {len(snapshots)} snapshots ajoutés dans '{collection_name}'")
+    except Exception as e:
+        METRICS.inc("db_errors", collection=collection_name)
+        print(f"❌ Erreur MongoDB (snapshots '{collection_name}'): {e}")
+
+
+def insert_ranking_snapshots(data, region):
+    _insert_snapshots(RANKING_SNAPSHOTS, (ranking_snapshot(doc, region) for doc in data))
+
+
+def insert_profile_snapshots(data):
+    _insert_snapshots(PROFILE_SNAPSHOTS, (profile_snapshot(doc) for doc in data))
+
+
+def get_channel_history(name, start=None, end=None, kind="ranking", region=None):
+    """
+    Historique d'une chaîne entre `start` et `end` (datetime), trié par date.
+    `kind` : "ranking" (viewership_snapshots) ou "profile" (profile_snapshots).
+    """
+    query = {"name": name}
+    if start or end:
+        query["scraped_at"] = {}
+        if start:
+            query["scraped_at"]["$gte"] = _to_datetime(start)
+        if end:
+            query["scraped_at"]["$lt"] = _to_datetime(end)
+    if region:
+        query["region"] = region
+
+    collection = get_db()[RANKING_SNAPSHOTS if kind == "ranking" else PROFILE_SNAPSHOTS]
+    return list(collection.find(query, {"_id": 0}).sort("scraped_at", 1))
@@ -0,0 +1,80 @@
+import math
+from datetime import datetime, timezone
+
+from db.mongo_client import get_db
+from scraper.numbers import parse_number
+
+SUMMARIES = "ranking_summaries"
+TOP_N = 10
+HISTOGRAM_FIELDS = ("avg_viewers", "total_followers")
+
+
+def log_histogram(values, bins_per_decade=4):
+    """Histogramme à pas logarithmique (les audiences sont très étalées) : [{"min", "max", "count"}]"""
+    values = [v for v in values if v and v > 0]
+    if not values:
+        return []
+    low = math.floor(math.log10(min(values)) * bins_per_decade)
+    high = math.floor(math.log10(max(values)) * bins_per_decade)
+    counts = [0] * (high - low + 1)
+    for value in values:
+        counts[math.floor(math.log10(value) * bins_per_decade) - low] += 1
+    return [
+        {
+            "min": round(10 ** ((low + i) / bins_per_decade)),
+            "max": round(10 ** ((low + i + 1) / bins_per_decade)),
+            "count": count
+        }
+        for i, count in enumerate(counts)
+    ]
+
+
+def summary_row(doc):
+    """Champs d'une ligne de classement utilisés par le résumé (de quoi le construire au fil de l'eau)"""
+    return {
+        "rank": doc.get("rank"),
+        "name": doc.get("name"),
+        "avg_viewers": parse_number(doc.get("avg_viewers")) or 0,
+        "total_followers": parse_number(doc.get("total_followers")) or 0,
+        "hours_streamed": parse_number(doc.get("hours_streamed")) or 0,
+        "scraped_at": doc.get("scraped_at"),
+    }
+
+
+def build_ranking_summary(region, collection_name, data, top_n=TOP_N):
+    """
+    Résumé d'un classement scrapé : totaux, top-N par rang et histogrammes.
+    `scraped_from` (première ligne écrite par le run) délimite dans la collection les lignes de ce run :
+    les chaînes sorties du classement y gardent un scraped_at plus ancien.
+    """
+    rows = [summary_row(doc) for doc in data]
+    rows.sort(key=lambda row: row["rank"] or 0)
+
+    return {
+        "region": region,
+        "collection": collection_name,
+        "snapshot_at": datetime.now(timezone.utc),
+        "scraped_from": min((row["scraped_at"] for row in rows if row["scraped_at"]), default=None),
+        "count": len(rows),
+        "max_viewers": max((row["avg_viewers"] for row in rows), default=0),
+        "max_followers": max((row["total_followers"] for row in rows), default=0),
+        "sum_followers": sum(row["total_followers"] for row in rows),
+        "sum_hours": sum(row["hours_streamed"] for row in rows),
+        "top": rows[:top_n],
+        "histograms": {field: log_histogram([row[field] for row in rows]) for field in HISTOGRAM_FIELDS},
+    }
+
+
+def insert_ranking_summary(region, collection_name, data):
+    """Matérialise le résumé du scraping qui vient d'être inséré (un document par région et par run)"""
+    try:
+        summary = build_ranking_summary(region, collection_name, data)
+        get_db()[SUMMARIES].create_index([("region", 1), ("snapshot_at", -1)])
+        get_db()[SUMMARIES].insert_one(summary)
+        print(f"📈 Résumé '{region}' enregistré ({summary['count']} streamers)")
+    except Exception as e:
+        print(f"❌ Erreur MongoDB (résumé '{region}'): {e}")
+
+
+def get_latest_summary(region):
+    return get_db()[SUMMARIES].find_one({"region": region}, {"_id": 0}, sort=[("snapshot_at", -1)])
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+from pymongo import ReturnDocument
+
+from db.mongo_client import get_db
+
+DATA_VERSIONS = "data_versions"
+
+
+def bump_data_version(collection_name):
+    """
+    Incrémente la version d'une collection à la fin d'un run de scraping.
+    Le dashboard utilise ce numéro comme clé de cache : il ne recharge que ce qui a changé.
+    """
+    try:
+        doc = get_db()[DATA_VERSIONS].find_one_and_update(
+            {"_id": collection_name},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["version"]
+    except Exception as e:
+        print(f"❌ Erreur MongoDB (version '{collection_name}'): {e}")
+        return None
+
+
+def get_data_version(collection_name):
+    doc = get_db()[DATA_VERSIONS].find_one({"_id": collection_name}, {"version": 1})
+    return doc["version"] if doc else 0
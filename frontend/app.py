@@ -1,18 +1,30 @@
 import streamlit as st
-from pymongo import MongoClient
 import pandas as pd
 from dotenv import load_dotenv
 import os
 import plotly.express as px
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scraper.numbers import parse_number, parse_number_series
+from db.games import get_game_channels, get_games
+from db.mongo_client import get_db
+from db.summaries import get_latest_summary
+from db.versions import get_data_version as read_data_version
+from frontend.profile_store import ProfileStore, load_profile_details
 
 # Chargement des variables d'environnement
 load_dotenv()
-MONGO_URI = os.getenv("MONGODB_URI")
+# TTL optionnel (secondes) des caches de données, en plus de l'invalidation par version de run
+CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "0")) or None
+VERSION_TTL = int(os.getenv("DASHBOARD_VERSION_TTL", "15"))
+
+# Connexion MongoDB : un seul client (et son pool) partagé par toutes les sessions Streamlit
+@st.cache_resource
+def get_database():
+    return get_db()
 
-# Connexion MongoDB
-client = MongoClient(MONGO_URI)
-db = client["twitchtracker"]
-profiles_collection = db["profiles"]
+db = get_database()
 
 # Configuration Streamlit
 st.set_page_config(
@@ -69,77 +81,112 @@ st.markdown("""
 region = st.sidebar.radio("🌍 Région", ["France", "Monde"], horizontal=True)
 collection = db["viewership_fr"] if region == "France" else db["viewership_world"]
 
-# Tabs
-tab1, tab2 = st.tabs(["📊 Classement & Stats", "👤 Profils Détaillés"])
+@st.cache_data(ttl=VERSION_TTL)
+def get_data_version(name: str):
+    """
+    Version de la collection écrite par chaque run de scraping (voir db/versions.py).
+    Passée en argument aux loaders : un nouveau run invalide uniquement les caches de cette collection.
+    """
+    return read_data_version(name)
 
-# Safe eval
-def safe_eval(x):
-    try:
-        return float(eval(x))
-    except:
-        return None
+# Tabs
+tab1, tab2, tab3, tab4 = st.tabs(["📊 Classement & Stats", "👤 Profils Détaillés", "📈 Tendances", "🎮 Par jeu"])
 
 # ---------- TAB 1 ----------
 with tab1:
     collection_name = "viewership_fr" if region == "France" else "viewership_world"
 
-    @st.cache_data
-    def load_data_from_collection(name: str):
-        data = list(db[name].find({}, {"_id": 0}))
-        df = pd.DataFrame(data)
-
-        for col in ["avg_viewers", "total_followers", "hours_streamed", "followers_gain"]:
-            df[col] = (
-                df[col]
-                .astype(str)
-                .str.replace(",", "")
-                .str.replace("K", "*1e3")
-                .str.replace("M", "*1e6")
-                .apply(safe_eval)
-            )
-
-        if "rank" in df.columns:
-            df["rank"] = df["rank"].astype(int)
-            df = df.sort_values(by="rank")
+    NUMERIC_COLUMNS = ["avg_viewers", "total_followers", "hours_streamed", "followers_gain"]
+    CARD_COLUMNS = ["rank", "name", "profile_url", *NUMERIC_COLUMNS]
 
+    def to_frame(docs):
+        """DataFrame typé à partir des documents (les anciens documents texte sont convertis en vectorisé)"""
+        df = pd.DataFrame(docs, columns=CARD_COLUMNS)
+        for col in NUMERIC_COLUMNS:
+            df[col] = parse_number_series(df[col])
         return df
 
-    df = load_data_from_collection(collection_name)
-
-
-    if df.empty:
+    @st.cache_data(ttl=CACHE_TTL)
+    def load_collection_stats(name: str, version: int):
+        """Totaux et maxima calculés côté MongoDB"""
+        stats = next(db[name].aggregate([{"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "max_viewers": {"$max": "$avg_viewers"},
+            "max_followers": {"$max": "$total_followers"},
+            "sum_followers": {"$sum": "$total_followers"},
+            "sum_hours": {"$sum": "$hours_streamed"},
+        }}]), None)
+        if not stats:
+            return {"count": 0, "max_viewers": 0, "max_followers": 0, "sum_followers": 0, "sum_hours": 0}
+        return {key: parse_number(value) or 0 for key, value in stats.items() if key != "_id"}
+
+    @st.cache_data(ttl=CACHE_TTL)
+    def count_filtered(name: str, version: int, since: str, min_viewers: int, min_followers: int):
+        return db[name].count_documents(ranking_query(since, min_viewers, min_followers))
+
+    @st.cache_data(ttl=CACHE_TTL)
+    def load_ranking_page(name: str, version: int, since: str, min_viewers: int, min_followers: int, page: int, per_page: int):
+        """Une page du classement : filtre, tri par rang et fenêtre appliqués par MongoDB"""
+        cursor = (
+            db[name]
+            .find(ranking_query(since, min_viewers, min_followers), {"_id": 0, **{col: 1 for col in CARD_COLUMNS}})
+            .sort("rank", 1)
+            .skip((page - 1) * per_page)
+            .limit(per_page)
+        )
+        return to_frame(list(cursor))
+
+    def ranking_query(since, min_viewers, min_followers):
+        """
+        Lignes du dernier run (scraped_at >= `since`, début du run d'après son résumé) : les chaînes
+        sorties du classement restent dans la collection mais ne sont ni comptées ni affichées.
+        """
+        query = {"scraped_at": {"$gte": since}} if since else {}
+        if min_viewers:
+            query["avg_viewers"] = {"$gte": min_viewers}
+        if min_followers:
+            query["total_followers"] = {"$gte": min_followers * 1000}
+        return query
+
+    @st.cache_data(ttl=CACHE_TTL)
+    def load_summary(region_key: str, version: int):
+        """Dernier résumé matérialisé par main.py (voir db/summaries.py), None si absent"""
+        return get_latest_summary(region_key)
+
+    version = get_data_version(collection_name)
+    summary = load_summary("fr" if region == "France" else "world", version)
+    stats = summary or load_collection_stats(collection_name, version)
+    # Même périmètre que le résumé (en-tête, top 10, bornes des filtres) pour le compte et les pages
+    since = summary.get("scraped_from") if summary else None
+
+    if not stats["count"]:
         st.warning(f"Aucune donnée trouvée dans '{collection_name}'")
     else:
-        st.success(f"{len(df)} streamers chargés depuis `{collection_name}`")
+        st.success(f"{stats['count']} streamers disponibles dans `{collection_name}`")
 
     with st.sidebar:
         st.subheader("🎯 Navigation")
-        st.metric("Total Streamers", len(df))
-        st.metric("Top Viewers", f"{int(df['avg_viewers'].max()):,}")
-        st.metric("Total Followers", f"{int(df['total_followers'].sum()/1e6):.1f}M")
-        st.metric("Heures Streamées", f"{int(df['hours_streamed'].sum()):,}h")
-        st.markdown("---")
-
-        per_page = st.selectbox("Résultats par page", [10, 25, 50, 100], index=2)
-        total_pages = (len(df) - 1) // per_page + 1
-        page = st.number_input("Page", min_value=1, max_value=total_pages, value=1, step=1)
+        st.metric("Total Streamers", stats["count"])
+        st.metric("Top Viewers", f"{int(stats['max_viewers'] or 0):,}")
+        st.metric("Total Followers", f"{int(stats['sum_followers'] or 0)/1e6:.1f}M")
+        st.metric("Heures Streamées", f"{int(stats['sum_hours'] or 0):,}h")
         st.markdown("---")
 
         st.subheader("🔍 Filtres")
-        min_viewers = st.slider("Viewers minimum", 0, int(df['avg_viewers'].max()), 0)
-        min_followers = st.slider("Followers minimum (K)", 0, int(df['total_followers'].max()/1000), 0)
+        min_viewers = st.slider("Viewers minimum", 0, int(stats["max_viewers"] or 0), 0)
+        min_followers = st.slider("Followers minimum (K)", 0, int((stats["max_followers"] or 0) / 1000), 0)
+        st.markdown("---")
 
-    filtered_df = df[
-        (df["avg_viewers"] >= min_viewers) &
-        (df["total_followers"] >= min_followers * 1000)
-    ]
+        filtered_count = count_filtered(collection_name, version, since, min_viewers, min_followers)
+        per_page = st.selectbox("Résultats par page", [10, 25, 50, 100], index=2)
+        total_pages = max(1, (filtered_count - 1) // per_page + 1)
+        page = st.number_input("Page", min_value=1, max_value=total_pages, value=1, step=1)
 
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_df = filtered_df.iloc[start:end]
+    paginated_df = load_ranking_page(collection_name, version, since, min_viewers, min_followers, page, per_page)
 
     col1, col2 = st.columns(2)
-    top10 = df.head(10)
+    top10 = pd.DataFrame(summary["top"]) if summary else load_ranking_page(collection_name, version, None, 0, 0, 1, 10)
 
     with col1:
         fig = px.bar(top10, x="avg_viewers", y="name", orientation="h", color="avg_viewers")
@@ -149,9 +196,15 @@ with tab1:
         fig2 = px.bar(top10, x="total_followers", y="name", orientation="h", color="total_followers")
         st.plotly_chart(fig2, use_container_width=True)
 
-    st.markdown(f"### 🎯 Page {page}/{total_pages} — {len(filtered_df)} streamers filtrés")
+    if summary and summary["histograms"]["avg_viewers"]:
+        histogram = pd.DataFrame(summary["histograms"]["avg_viewers"])
+        histogram["viewers"] = histogram["min"].map("{:,}".format) + " – " + histogram["max"].map("{:,}".format)
+        fig3 = px.bar(histogram, x="viewers", y="count", title="Répartition des viewers moyens")
+        st.plotly_chart(fig3, use_container_width=True)
 
-    for _, row in paginated_df.iterrows():
+    st.markdown(f"### 🎯 Page {page}/{total_pages} — {filtered_count} streamers filtrés")
+
+    for row in paginated_df.fillna(0).to_dict("records"):
         card_class = "streamer-card top-streamer" if row["rank"] <= 3 else "streamer-card"
         rank_emoji = {1: "🥇", 2: "🥈", 3: "🥉"}.get(row["rank"], "🎮")
         st.markdown(f"""
@@ -170,53 +223,168 @@ with tab1:
 with tab2:
     st.markdown("### 👤 Profils Détaillés")
 
-    @st.cache_data
-    def load_profiles(region):
-        if region == "France":
-            query = {"channel_info.language": "French"}
-        else:
-            query = {"channel_info.language": {"$ne": "French"}}
-        data = list(profiles_collection.find(query, {"_id": 0}))
-        return pd.DataFrame(data)
+    @st.cache_resource(max_entries=4)
+    def load_profile_store(region: str, version: int):
+        """
+        Table compacte des profils (frontend/profile_store.py) : une seule instance par région
+        et par version, partagée par toutes les sessions au lieu d'une copie par session.
+        """
+        return ProfileStore.load(region)
+
+    @st.cache_data(ttl=CACHE_TTL, max_entries=256)
+    def load_details(name: str, version: int):
+        """Bio et tables filles (top jeux, streams récents) chargées pour le seul profil affiché"""
+        return load_profile_details(name)
 
-    profiles_df = load_profiles(region)
+    @st.cache_resource
+    def load_similarity_index(version: int):
+        """Index de similarité du run (analytics/similarity.py), chargé une fois et partagé par les sessions"""
+        from analytics.similarity import SimilarityIndex
+        return SimilarityIndex.load(version) or SimilarityIndex.load()
 
-    if not profiles_df.empty:
-        st.success(f"{len(profiles_df)} profils détaillés disponibles")
-        selected = st.selectbox("🌟 Choisir un streamer", sorted(profiles_df['name'].tolist()))
+    profiles_version = get_data_version("profiles")
+    store = load_profile_store(region, profiles_version)
+
+    if len(store):
+        st.success(f"{len(store)} profils détaillés disponibles")
+        selected = st.selectbox("🌟 Choisir un streamer", store.names)
 
         if selected:
-            profile = profiles_df[profiles_df['name'] == selected].iloc[0]
+            profile = store.row(selected)
+            details = load_details(selected, profiles_version)
+            rank = "N/A" if pd.isna(profile["rank"]) else profile["rank"]
+            scraped_at = "" if pd.isna(profile["scraped_at"]) else f"{profile['scraped_at']:%Y-%m-%d}"
             st.markdown(f"""
                 <div class="profile-card">
-                    <h2>🎮 {profile.get('name')}</h2>
-                    <p><strong>🔗 Profil:</strong> <a href="{profile.get('profile_url')}" target="_blank">Voir sur TwitchTracker</a></p>
-                    <p><strong>🏆 Rang:</strong> #{profile.get('rank', 'N/A')}</p>
-                    <p><strong>🗓️ Scrapé le:</strong> {profile.get('scraped_at', '')[:10]}</p>
+                    <h2>🎮 {profile['name']}</h2>
+                    <p><strong>🔗 Profil:</strong> <a href="{profile['profile_url']}" target="_blank">Voir sur TwitchTracker</a></p>
+                    <p><strong>🏆 Rang:</strong> #{rank}</p>
+                    <p><strong>🗓️ Scrapé le:</strong> {scraped_at}</p>
                 </div>
             """, unsafe_allow_html=True)
 
             st.subheader("📝 Biographie")
-            st.markdown(f"*{profile.get('bio', 'Aucune biographie disponible')}*")
+            st.markdown(f"*{details['bio'] or 'Aucune biographie disponible'}*")
 
             st.subheader("📊 Statistiques")
-            for key, val in profile.get("additional_stats", {}).items():
+            for key, val in store.stats(selected).items():
+                st.metric(key.replace("_", " ").title(), f"{val:,.0f}" if float(val).is_integer() else f"{val:,.2f}")
+            for key, val in details["text_stats"].items():
                 st.metric(key.replace("_", " ").title(), val)
 
             st.subheader("📺 Infos du Channel")
-            for key, val in profile.get("channel_info", {}).items():
+            for key, val in details["channel_info"].items():
                 st.write(f"**{key.replace('_', ' ').title()}:** {val}")
 
             st.subheader("🎮 Top Jeux")
-            for i, game in enumerate(profile.get("top_games", []), 1):
-                st.markdown(f"**{i}.** {game.get('game')} – {game.get('hours')}")
+            for game in details["top_games"].itertuples():
+                st.markdown(f"**{game.position}.** {game.game} – {'N/A' if pd.isna(game.hours) else f'{game.hours:,.0f}'}")
 
             st.subheader("📺 Streams Récents")
-            for stream in profile.get("recent_streams", []):
-                st.markdown(f"- {stream.get('date')} – {stream.get('game')} ({stream.get('duration')})")
+            for stream in details["recent_streams"].itertuples():
+                started_at = "N/A" if pd.isna(stream.started_at) else f"{stream.started_at:%Y-%m-%d %H:%M}"
+                st.markdown(f"- {started_at} – {stream.game} ({stream.duration})")
+
+            st.subheader("🤝 Streamers similaires")
+            index = load_similarity_index(get_data_version("profiles"))
+            if index is None or selected not in index.positions:
+                st.info("Index de similarité indisponible : lancez `python main.py similarity`.")
+            else:
+                st.dataframe(index.similar(selected, k=10), hide_index=True, use_container_width=True)
     else:
         st.warning("⚠️ Aucun profil trouvé. Lancez `main_profiles.py` pour les scraper.")
 
+# ---------- TAB 3 ----------
+with tab3:
+    st.markdown("### 📈 Tendances")
+    region_key = "fr" if region == "France" else "world"
+
+    @st.cache_data(ttl=CACHE_TTL)
+    def load_trends(region_key: str, periods: int, version: int):
+        """Croissances et évolutions de rang (analytics/trends.py, cache disque par snapshot)"""
+        from analytics.trends import channel_trends
+        return channel_trends(region_key, periods)
+
+    @st.cache_data(ttl=CACHE_TTL)
+    def load_stream_analytics(method: str, version: int):
+        from analytics.trends import best_hours, stream_spikes_report
+        return stream_spikes_report(method), best_hours()
+
+    window = st.radio("⏱️ Fenêtre de croissance", ["24 h", "7 jours", "30 jours"], horizontal=True)
+    periods = {"24 h": 24, "7 jours": 24 * 7, "30 jours": 24 * 30}[window]
+    trends = load_trends(region_key, periods, get_data_version("viewership_fr" if region == "France" else "viewership_world"))
+
+    if trends.empty:
+        st.warning("⚠️ Aucun historique de snapshots pour cette région.")
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("🚀 Étoiles montantes")
+            st.dataframe(
+                trends.nlargest(20, "total_followers_growth")[["name", "rank", "total_followers", "total_followers_growth"]],
+                hide_index=True, use_container_width=True
+            )
+        with col2:
+            st.subheader("↕️ Plus fortes progressions de rang")
+            st.dataframe(
+                trends.nlargest(20, "rank_delta")[["name", "rank", "rank_delta", "avg_viewers_growth"]],
+                hide_index=True, use_container_width=True
+            )
+
+    method = st.radio("🔎 Détection des pics", ["zscore", "iqr"], horizontal=True)
+    spikes, hours = load_stream_analytics(method, get_data_version("profiles"))
+    st.subheader("⚡ Streams inhabituels")
+    if spikes.empty:
+        st.info("Aucun pic d'audience détecté.")
+    else:
+        st.dataframe(spikes.head(50), hide_index=True, use_container_width=True)
+
+    if not hours.empty:
+        st.subheader("🕒 Meilleures heures de stream (UTC)")
+        st.plotly_chart(
+            px.bar(hours, x="hour", y="relative_viewers",
+                   labels={"hour": "Heure de début", "relative_viewers": "Viewers / médiane de la chaîne"}),
+            use_container_width=True
+        )
+
+# ---------- TAB 4 ----------
+with tab4:
+    st.markdown("### 🎮 Parcourir par jeu")
+    # Même découpage que les classements : chaînes francophones d'un côté, toutes les autres de l'autre
+    language, excluded = ("French", None) if region == "France" else (None, "French")
+
+    @st.cache_data(ttl=CACHE_TTL)
+    def load_games(language: str, excluded: str, profiles_version: int, games_version: int):
+        """Jeux de l'index matérialisé (db/games.py), triés par heures de stream"""
+        return pd.DataFrame(get_games(language, excluded))
+
+    GAME_CHANNEL_COLUMNS = ["name", "language", "streams", "hours", "peak_viewers", "avg_viewers", "last_stream"]
+
+    @st.cache_data(ttl=CACHE_TTL)
+    def load_game_channels(game: str, language: str, excluded: str, profiles_version: int, games_version: int):
+        """Chaînes d'un jeu (db/games.py), triées par heures de stream"""
+        return pd.DataFrame(get_game_channels(game, language, limit=200, exclude_language=excluded),
+                            columns=GAME_CHANNEL_COLUMNS)
+
+    versions = (get_data_version("profiles"), get_data_version("games"))
+    games_df = load_games(language, excluded, *versions)
+
+    if games_df.empty:
+        st.warning("⚠️ Aucun jeu indexé. Scrapez des profils ou lancez `python main.py games`.")
+    else:
+        selected_game = st.selectbox("🕹️ Jeu", games_df["game"].tolist())
+        channels_df = load_game_channels(selected_game, language, excluded, *versions)
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("📺 Chaînes", len(channels_df))
+        col2.metric("🕒 Heures streamées", f"{channels_df['hours'].sum():,.0f}")
+        col3.metric("🔝 Pic de viewers", f"{channels_df['peak_viewers'].max():,.0f}")
+        col4.metric("👁️ Viewers moyens", f"{(channels_df['avg_viewers'] * channels_df['streams']).sum() / channels_df['streams'].sum():,.0f}")
+
+        st.dataframe(channels_df, hide_index=True, use_container_width=True)
+        with st.expander("📋 Tous les jeux"):
+            st.dataframe(games_df, hide_index=True, use_container_width=True)
+
 # Footer
 st.markdown("---")
 st.markdown("""
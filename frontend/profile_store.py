@@ -0,0 +1,136 @@
+"""
+Représentation compacte des profils pour le dashboard.
+
+La table principale ne garde qu'une ligne typée par profil : nom et URL en chaînes Arrow
+(dictionnaire pour les noms), langue et statut catégoriels, rang entier, date ; les statistiques
+numériques de `additional_stats` sont dans une table float32 alignée sur elle. Les bios et les listes imbriquées
+(`top_games`, `recent_streams`) n'y sont pas : elles sont chargées à la demande, pour le seul
+profil affiché, sous forme de tables filles colonnaires (jeux catégoriels, nombres typés).
+"""
+import numpy as np
+import pandas as pd
+
+from db.mongo_client import get_db
+from scraper.numbers import parse_duration, parse_number
+
+ARROW_STRING = "string[pyarrow]"
+# Champs lus pour la table principale : tout le reste est chargé à la demande
+SUMMARY_PROJECTION = {"_id": 0, "name": 1, "profile_url": 1, "rank": 1, "scraped_at": 1,
+                      "channel_info": 1, "additional_stats": 1}
+DETAIL_PROJECTION = {"_id": 0, "bio": 1, "channel_info": 1, "additional_stats": 1, "top_games": 1, "recent_streams": 1}
+
+
+def region_query(region):
+    if region == "France":
+        return {"channel_info.language": "French"}
+    return {"channel_info.language": {"$ne": "French"}}
+
+
+class ProfileStore:
+    """
+    Table compacte des profils d'une région (`frame`) et statistiques numériques alignées sur
+    ses lignes (`stats_frame`, une colonne float32 par clé de `additional_stats`).
+    Immuable une fois construite : une même instance peut être partagée par toutes les sessions.
+    """
+
+    def __init__(self, frame, stats_frame):
+        self.frame = frame
+        self.stats_frame = stats_frame
+        self.names = sorted(frame["name"].astype(str).tolist())
+        self.positions = {name: i for i, name in enumerate(frame["name"].astype(str))}
+
+    def __len__(self):
+        return len(self.frame)
+
+    @classmethod
+    def from_documents(cls, docs):
+        columns = {"name": [], "profile_url": [], "rank": [], "scraped_at": [],
+                   "language": [], "status": [], "created_date": []}
+        stats = {}
+        for i, doc in enumerate(docs):
+            info = doc.get("channel_info") or {}
+            columns["name"].append(doc.get("name"))
+            columns["profile_url"].append(doc.get("profile_url"))
+            columns["rank"].append(parse_number(doc.get("rank")))
+            columns["scraped_at"].append(doc.get("scraped_at"))
+            columns["language"].append(info.get("language"))
+            columns["status"].append(info.get("status"))
+            columns["created_date"].append(info.get("created_date"))
+            for key, value in (doc.get("additional_stats") or {}).items():
+                number = parse_number(value)
+                if number is not None:
+                    # Une colonne par statistique, NaN pour les profils qui ne l'ont pas
+                    stats.setdefault(key, {})[i] = number
+        count = len(columns["name"])
+
+        names = pd.Index(pd.unique(pd.Series(columns["name"], dtype=ARROW_STRING).dropna()))
+        frame = pd.DataFrame({
+            "name": pd.Categorical(columns["name"], categories=names),
+            "profile_url": pd.Series(columns["profile_url"], dtype=ARROW_STRING),
+            "rank": pd.Series(columns["rank"], dtype="Int32"),
+            "scraped_at": pd.to_datetime(pd.Series(columns["scraped_at"], dtype=object), errors="coerce", utc=True, format="ISO8601"),
+            "language": pd.Series(columns["language"], dtype="category"),
+            "status": pd.Series(columns["status"], dtype="category"),
+            "created_date": pd.Series(columns["created_date"], dtype=ARROW_STRING),
+        })
+        stats_frame = pd.DataFrame(index=frame.index)
+        if stats:
+            columns = {}
+            for key, values in stats.items():
+                columns[key] = np.full(count, np.nan, dtype=np.float32)
+                columns[key][list(values)] = list(values.values())
+            stats_frame = pd.DataFrame(columns, index=frame.index)
+        return cls(frame, stats_frame)
+
+    @classmethod
+    def load(cls, region):
+        """Profils de la région lus avec une projection (sans bios ni listes imbriquées)"""
+        return cls.from_documents(get_db()["profiles"].find(region_query(region), SUMMARY_PROJECTION))
+
+    def row(self, name):
+        return self.frame.iloc[self.positions[name]]
+
+    def stats(self, name):
+        """Statistiques numériques renseignées d'un profil : {clé: valeur}"""
+        row = self.stats_frame.iloc[self.positions[name]]
+        return row.dropna().to_dict()
+
+    def memory_usage(self):
+        """Empreinte mémoire des tables (octets, contenu des chaînes compris)"""
+        return int(self.frame.memory_usage(deep=True).sum() + self.stats_frame.memory_usage(deep=True).sum())
+
+
+def child_tables(doc):
+    """Tables filles colonnaires d'un document profil : (top_games, recent_streams)"""
+    top_games = doc.get("top_games") or []
+    streams = doc.get("recent_streams") or []
+    games = pd.DataFrame({
+        "position": pd.Series(range(1, len(top_games) + 1), dtype="int8"),
+        "game": pd.Series([game.get("game") for game in top_games], dtype="category"),
+        "hours": pd.Series([parse_number(game.get("hours")) for game in top_games], dtype="float32"),
+    })
+    recent = pd.DataFrame({
+        "started_at": pd.to_datetime(pd.Series([stream.get("date") for stream in streams], dtype=object), errors="coerce", utc=True),
+        "game": pd.Series([stream.get("game") for stream in streams], dtype="category"),
+        "duration": pd.Series([stream.get("duration") for stream in streams], dtype=ARROW_STRING),
+        "hours": pd.Series([parse_duration(stream.get("duration")) for stream in streams], dtype="float32"),
+        "max_viewers": pd.Series([parse_number(stream.get("max_viewers")) for stream in streams], dtype="float32"),
+        "all_games": pd.Series([", ".join(stream.get("all_games") or []) for stream in streams], dtype=ARROW_STRING),
+    })
+    return games, recent
+
+
+def load_profile_details(name):
+    """Bio, infos de la chaîne, statistiques textuelles et tables filles d'un seul profil"""
+    doc = get_db()["profiles"].find_one({"name": name}, DETAIL_PROJECTION) or {}
+    top_games, recent_streams = child_tables(doc)
+    return {
+        "bio": doc.get("bio"),
+        "channel_info": doc.get("channel_info") or {},
+        # Statistiques non numériques, absentes de la table principale
+        "text_stats": {
+            key: value for key, value in (doc.get("additional_stats") or {}).items() if parse_number(value) is None
+        },
+        "top_games": top_games,
+        "recent_streams": recent_streams,
+    }
@@ -1,11 +1,30 @@
+import argparse
+import asyncio
+import functools
+import sys
+from datetime import datetime, timezone
 from scraper.viewership_fr import scrape_viewership_fr
 from scraper.viewership_world import scrape_viewership_world
-from scraper.profiles import scrape_all_profiles_fr, scrape_all_profiles_world
+from scraper.profiles import scrape_all_profiles, scrape_all_profiles_fr, scrape_all_profiles_world
+from scraper.rankings import SITE_URL, LEADERBOARDS, ranking_row_hash, stream_ranking
+from scraper.pool import HostRateLimiter
+from scraper.scheduler import Job, run_jobs
+from scraper.checkpoint import BatchWriter, ScrapeCheckpoint
+from scraper.metrics import METRICS, write_run_report
 from db.insert_data import (
+    RANKING_TARGETS,
+    ensure_indexes,
+    finish_profiles_insert,
+    finish_ranking_insert,
+    insert_profile_batch,
+    insert_ranking_batch,
+    insert_ranking_data,
     insert_viewership_data,
     insert_viewership_world_data,
     insert_profiles_data
 )
+from db.summaries import summary_row
+from db.games import rebuild_game_index
 
 def scrape_france():
     """Scraper uniquement les streamers français"""
@@ -25,23 +44,60 @@ def scrape_world():
     print("✅ Données mondiales insérées dans MongoDB !")
     return data_world
 
-def scrape_profiles_fr():
+PROFILE_BATCH_SIZE = 20
+RANKING_BATCH_SIZE = 50
+DEFAULT_RATE = 2.0
+
+def stream_profiles(scrape, job_name, dry_run=False, batch_size=PROFILE_BATCH_SIZE, export=None, **kwargs):
+    """
+    Scrape des profils en les écrivant au fil de l'eau par lots de `batch_size`,
+    avec un checkpoint qui permet de reprendre un run interrompu.
+    `export(batch)` reçoit chaque lot écrit (ex. export Parquet). La version des profils et les totaux
+    de l'index par jeu ne sont mis à jour qu'une fois, en fin de run.
+    Renvoie le nombre de profils écrits ; lève RuntimeError si un lot n'a pas pu être écrit.
+    """
+    checkpoint = None if dry_run else ScrapeCheckpoint.for_job(job_name)
+    touched_games = set()
+
+    def insert(batch):
+        if not dry_run and not insert_profile_batch(batch, touched_games):
+            return False
+        if export:
+            export(batch)
+        return True
+
+    writer = BatchWriter(insert, batch_size=batch_size, checkpoint=checkpoint)
+    try:
+        scrape(on_result=writer.add, checkpoint=checkpoint, **kwargs)
+    finally:
+        writer.close()
+        if writer.written and not dry_run:
+            # Même pour un run interrompu : les profils déjà écrits deviennent visibles
+            finish_profiles_insert(touched_games)
+
+    if checkpoint:
+        checkpoint.finish()
+    if writer.failed_batches:
+        raise RuntimeError(f"{writer.failed_batches} lot(s) de profils non écrits ({job_name})")
+    return writer.written
+
+def scrape_profiles_fr(incremental=False):
     """Scraper les profils détaillés des streamers français"""
     print("\n👤 SCRAPING PROFILS FR")
     print("-" * 30)
-    profiles_data = scrape_all_profiles_fr()
-    insert_profiles_data(profiles_data)
+    count = stream_profiles(scrape_all_profiles_fr, "profiles_fr", incremental=incremental)
     print("✅ Profils détaillés FR insérés dans MongoDB !")
-    return profiles_data
+    return count
 
-def scrape_profiles_world():
+def scrape_profiles_world(incremental=False):
     """Scraper les profils détaillés des streamers mondiaux"""
     print("\n🌐 SCRAPING PROFILS MONDIAUX")
     print("-" * 30)
-    profiles_data = scrape_all_profiles_world(limit=50)  # Limite optionnelle
-    insert_profiles_data(profiles_data)
+    count = stream_profiles(
+        scrape_all_profiles_world, "profiles_world", limit=50, incremental=incremental  # Limite optionnelle
+    )
     print("✅ Profils détaillés MONDIAUX insérés dans MongoDB !")
-    return profiles_data
+    return count
 
 def scrape_all():
     """Scraper France + Mondial"""
@@ -66,24 +122,98 @@ def scrape_everything():
     print("\n🎉 SCRAPING TERMINÉ AVEC SUCCÈS !")
     print(f"📊 Classement FR: {len(data_fr)} streamers")
     print(f"🌍 Classement World: {len(data_world)} streamers")
-    print(f"👤 Profils FR: {len(profiles_fr)}")
-    print(f"🌐 Profils World: {len(profiles_world)}")
+    print(f"👤 Profils FR: {profiles_fr}")
+    print(f"🌐 Profils World: {profiles_world}")
+
+async def scrape_pipeline_async(regions=("fr", "world"), depth=50, world_profiles_limit=50, profile_workers=6,
+                                concurrency=8, site_url=SITE_URL, rate_limiter=None):
+    """
+    Pipeline asynchrone : classements de `regions` (top `depth`) et profils dans une seule boucle d'événements.
+    Les profils sont récupérés dès que les lignes de classement arrivent ; pour le classement mondial,
+    seulement ceux des `world_profiles_limit` premiers. Les requêtes passent par `rate_limiter`
+    (débit adaptatif par hôte, par défaut celui de la CLI : 2 req/s, jusqu'à 8 req/s).
+    Renvoie (classements par région, profils, échecs) ; `échecs` liste les profils non récupérés
+    ("failed_profiles") et les écritures MongoDB en échec ("failed_writes").
+    """
+    # aiohttp n'est importé que pour ce pipeline : les autres commandes démarrent sans lui
+    from scraper.async_http import AsyncFetcher, scrape_profile_async, scrape_ranking_async
+
+    rate_limiter = rate_limiter or HostRateLimiter(DEFAULT_RATE, max_rate=DEFAULT_RATE * 4)
+    queue = asyncio.Queue(maxsize=100)
+    seen = set()
+    profiles_data = []
+    failed_profiles = []
+
+    async with AsyncFetcher(concurrency=concurrency, rate_limiter=rate_limiter) as fetcher:
+        def enqueue_for(region):
+            limit = world_profiles_limit if region == "world" else None
+
+            async def enqueue(streamer):
+                if (limit and streamer["rank"] > limit) or streamer["name"] in seen:
+                    return
+                seen.add(streamer["name"])
+                await queue.put(streamer)
+
+            return enqueue
+
+        async def profile_worker():
+            while True:
+                streamer = await queue.get()
+                if streamer is None:
+                    break
+                data = await scrape_profile_async(
+                    fetcher, streamer["profile_url"], streamer["name"], streamer["rank"]
+                )
+                if data:
+                    data["ranking_hash"] = ranking_row_hash(streamer)
+                    data["last_profile_scrape"] = data["scraped_at"]
+                    profiles_data.append(data)
+                else:
+                    failed_profiles.append(streamer["name"])
+
+        workers = [asyncio.create_task(profile_worker()) for _ in range(profile_workers)]
+        results = await asyncio.gather(*(
+            scrape_ranking_async(fetcher, region, depth=depth, site_url=site_url, on_row=enqueue_for(region))
+            for region in regions
+        ))
+        rankings = dict(zip(regions, results))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
 
+    failed_writes = []
+    for region, data in rankings.items():
+        if data and not await asyncio.to_thread(insert_ranking_data, region, data):
+            failed_writes.append(f"ranking_{region}")
+    if not await asyncio.to_thread(insert_profiles_data, profiles_data):
+        failed_writes.append("profiles")
 
-def main():
+    print("\n🏁 PIPELINE ASYNCHRONE TERMINÉ" + (" AVEC DES ÉCHECS" if failed_profiles or failed_writes else " !"))
+    for region, data in rankings.items():
+        print(f"📊 Classement {region}: {len(data)} streamers")
+    print(f"👤 Profils: {len(profiles_data)} ({len(failed_profiles)} en échec)")
+    if failed_writes:
+        print(f"❌ Écritures MongoDB en échec : {', '.join(failed_writes)}")
+    return rankings, profiles_data, {"failed_profiles": failed_profiles, "failed_writes": failed_writes}
+
+
+def interactive_menu():
     print("🎥 TWITCHTRACKER SCRAPER")
     print("=" * 50)
+    ensure_indexes()
     print("1. Scraper France uniquement")
     print("2. Scraper Top 500 Mondial uniquement")
     print("3. Scraper TOUT (France + Mondial)")
     print("4. Scraper Profils FR (viewership_fr)")
     print("5. Scraper Profils MONDIAUX (viewership_world)")
     print("6. 🔁 Tout scraper (Classements + Profils)")
+    print("7. ⚡ Tout scraper en pipeline asynchrone")
+    print("8. ♻️ Rafraîchir les profils modifiés (FR + Mondial, incrémental)")
     print("=" * 50)
 
     while True:
         try:
-            choice = input("\nChoix (1-5): ").strip()
+            choice = input("\nChoix (1-8): ").strip()
 
             if choice == "1":
                 scrape_france()
@@ -103,8 +233,15 @@ def main():
             elif choice == "6":
                 scrape_everything()
                 break
+            elif choice == "7":
+                asyncio.run(scrape_pipeline_async())
+                break
+            elif choice == "8":
+                scrape_profiles_fr(incremental=True)
+                scrape_profiles_world(incremental=True)
+                break
             else:
-                print("❌ Choix invalide. Tapez un nombre entre 1 et 6.")
+                print("❌ Choix invalide. Tapez un nombre entre 1 et 8.")
 
         except KeyboardInterrupt:
             print("\n\n👋 Scraping annulé.")
@@ -113,5 +250,233 @@ def main():
             print(f"❌ Erreur: {e}")
             break
 
+# ---------- CLI non interactive (cron / systemd) ----------
+
+PROFILE_JOBS = {
+    "fr": scrape_all_profiles_fr,
+    "world": scrape_all_profiles_world,
+}
+
+def ranking_job(region, args, rate_limiter, exporter=None):
+    """
+    Les lignes du classement sont écrites (MongoDB, export Parquet) par lots de RANKING_BATCH_SIZE
+    au fur et à mesure que les pages sont parsées, sans attendre la fin du scraping.
+    """
+
+    def write(batch):
+        if not args.dry_run and not insert_ranking_batch(region, batch):
+            return False
+        if exporter:
+            exporter.add_rankings(region, batch)
+        return True
+
+    def run():
+        writer = BatchWriter(write, batch_size=RANKING_BATCH_SIZE)
+        summary_rows = []
+        for streamer in stream_ranking(region, depth=args.depth, workers=args.workers, rate_limiter=rate_limiter):
+            writer.add(streamer)
+            summary_rows.append(summary_row(streamer))
+        writer.close()
+        if not summary_rows:
+            raise RuntimeError(f"Aucun streamer récupéré pour le classement '{region}'")
+        if writer.failed_batches:
+            raise RuntimeError(f"Échec de l'insertion du classement '{region}' ({writer.failed_batches} lots)")
+        if args.dry_run:
+            print(f"🧪 Dry-run : {len(summary_rows)} streamers '{region}' non insérés")
+        else:
+            finish_ranking_insert(region, summary_rows)
+
+    return run
+
+def profiles_job(region, args, rate_limiter, exporter=None):
+    # Classements sans scraper dédié : profils lus dans leur collection (viewership_<clé>)
+    scrape = PROFILE_JOBS.get(region) or functools.partial(scrape_all_profiles, RANKING_TARGETS[region][0])
+
+    def run():
+        failed = []
+        count = stream_profiles(
+            scrape, f"profiles_{region}", dry_run=args.dry_run, batch_size=args.batch_size, on_failure=failed.append,
+            export=(lambda batch: exporter.add_profiles(region, batch)) if exporter else None,
+            limit=args.profile_limit, workers=args.workers, parse_processes=args.parse_processes,
+            incremental=args.incremental, rate_limiter=rate_limiter
+        )
+        if args.dry_run:
+            print(f"🧪 Dry-run : {count} profils '{region}' non insérés")
+        if failed:
+            raise RuntimeError(f"{len(failed)} profil(s) '{region}' en échec : {', '.join(failed[:10])}")
+
+    return run
+
+def build_jobs(args, rate_limiter, exporter=None):
+    """Jobs du run : classements indépendants entre eux, profils après le classement de leur région"""
+    jobs = []
+    for region in args.regions:
+        if args.command in ("rankings", "all"):
+            jobs.append(Job(f"ranking_{region}", ranking_job(region, args, rate_limiter, exporter)))
+        if args.command in ("profiles", "all"):
+            deps = [f"ranking_{region}"] if args.command == "all" else []
+            jobs.append(Job(f"profiles_{region}", profiles_job(region, args, rate_limiter, exporter), deps))
+    if args.command in ("profiles", "all") and not args.dry_run:
+        # Index de similarité reconstruit (incrémentalement) une fois tous les profils écrits ;
+        # scipy n'est importé que dans ce cas
+        from analytics.similarity import update_index
+        jobs.append(Job("similarity_index", update_index, [f"profiles_{region}" for region in args.regions]))
+    return jobs
+
+def date_arg(value):
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Scraper TwitchTracker (sans argument : menu interactif)"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    regions = argparse.ArgumentParser(add_help=False)
+    regions.add_argument("--regions", nargs="+", choices=sorted(LEADERBOARDS), default=["fr", "world"],
+                         help="classements à scraper (clés de LEADERBOARDS, scraper/rankings.py)")
+
+    throttle = argparse.ArgumentParser(add_help=False)
+    throttle.add_argument("--rate", type=float, default=DEFAULT_RATE, help="débit initial de requêtes/seconde (partagé par les jobs)")
+    throttle.add_argument("--max-rate", type=float, help="plafond du débit adaptatif, réduit à chaque 429 (défaut : 4 × --rate)")
+
+    common = argparse.ArgumentParser(add_help=False, parents=[regions, throttle])
+    common.add_argument("--workers", type=int, default=4, help="requêtes HTTP simultanées par job")
+    common.add_argument("--parallel-jobs", type=int, default=2, help="jobs exécutés en même temps")
+    common.add_argument("--dry-run", action="store_true", help="scrape sans écrire dans MongoDB")
+    common.add_argument("--export-parquet", action="store_true", help="exporte aussi le run en Parquet (exports/parquet)")
+
+    ranking = argparse.ArgumentParser(add_help=False)
+    ranking.add_argument("--depth", type=int, default=50, help="nombre de streamers par classement")
+
+    profiles = argparse.ArgumentParser(add_help=False)
+    profiles.add_argument("--profile-limit", type=int, default=None, help="nombre max de profils par région")
+    profiles.add_argument("--parse-processes", type=int, default=0, help="processus de parsing (0 = threads)")
+    profiles.add_argument("--incremental", action="store_true", help="ne re-scraper que les profils modifiés")
+    profiles.add_argument("--batch-size", type=int, default=PROFILE_BATCH_SIZE, help="profils écrits par lot")
+
+    telemetry = argparse.ArgumentParser(add_help=False)
+    telemetry.add_argument("--report", help="chemin du rapport JSON (défaut : .cache/reports/<commande>-<date>.json)")
+    telemetry.add_argument("--metrics-file", help="fichier texte Prometheus écrit en fin de run (textfile collector / pushgateway)")
+    telemetry.add_argument("--metrics-port", type=int, help="expose /metrics au format Prometheus pendant le run")
+
+    subparsers.add_parser("rankings", parents=[common, ranking, telemetry], help="scraper les classements")
+    subparsers.add_parser("profiles", parents=[common, profiles, telemetry], help="scraper les profils")
+    subparsers.add_parser("all", parents=[common, ranking, profiles, telemetry], help="classements puis profils")
+    pipeline = subparsers.add_parser("pipeline", parents=[regions, throttle, ranking, telemetry], help="classements + profils en pipeline asynchrone")
+    pipeline.add_argument("--concurrency", type=int, default=8)
+    pipeline.add_argument("--profile-workers", type=int, default=6)
+    pipeline.add_argument("--world-profile-limit", type=int, default=50)
+    export = subparsers.add_parser("export", parents=[telemetry], help="exporter l'historique des classements en Parquet")
+    export.add_argument("--since", type=date_arg, help="date de début AAAA-MM-JJ (incluse)")
+    export.add_argument("--until", type=date_arg, help="date de fin AAAA-MM-JJ (exclue)")
+    similarity = subparsers.add_parser("similarity", parents=[telemetry], help="reconstruire l'index de streamers similaires")
+    similarity.add_argument("--full", action="store_true", help="tout recalculer au lieu de repartir de l'index précédent")
+    subparsers.add_parser("games", parents=[telemetry], help="reconstruire l'index par jeu depuis les profils existants")
+    return parser
+
+def run_pipeline_command(args):
+    ensure_indexes(args.regions)
+    rate_limiter = HostRateLimiter(args.rate, max_rate=args.max_rate or args.rate * 4)
+    start = datetime.now(timezone.utc)
+    rankings, _, failures = asyncio.run(scrape_pipeline_async(
+        regions=args.regions,
+        depth=args.depth,
+        world_profiles_limit=args.world_profile_limit,
+        profile_workers=args.profile_workers,
+        concurrency=args.concurrency,
+        rate_limiter=rate_limiter
+    ))
+    duration = round((datetime.now(timezone.utc) - start).total_seconds(), 2)
+    # Classement vide, écriture refusée ou profil non récupéré : le run est en échec (code de sortie 1)
+    ok = all(rankings.values()) and not failures["failed_writes"] and not failures["failed_profiles"]
+    results = {"pipeline": {"status": "ok" if ok else "failed", "duration": duration,
+                            "failed_profiles": len(failures["failed_profiles"]),
+                            "failed_writes": failures["failed_writes"]}}
+    if ok:
+        from analytics.similarity import update_index
+        results.update(run_jobs([Job("similarity_index", update_index)]))
+    return results, {"final_rates": rate_limiter.rates()}
+
+def run_export_command(args):
+    from db.parquet_export import export_ranking_history
+
+    start = datetime.now(timezone.utc)
+    paths = export_ranking_history(args.since, args.until)
+    duration = round((datetime.now(timezone.utc) - start).total_seconds(), 2)
+    print(f"📦 {len(paths)} fichiers Parquet écrits")
+    return {"export": {"status": "ok", "duration": duration}}, {"parquet_files": paths}
+
+def run_similarity_command(args):
+    from analytics.similarity import update_index
+
+    return run_jobs([Job("similarity_index", lambda: update_index(full=args.full))]), {}
+
+def run_games_command(args):
+    def rebuild():
+        if not rebuild_game_index():
+            raise RuntimeError("Échec de la reconstruction de l'index par jeu")
+
+    return run_jobs([Job("game_index", rebuild)]), {}
+
+def run_jobs_command(args):
+    if not args.dry_run:
+        ensure_indexes(args.regions)
+    rate_limiter = HostRateLimiter(args.rate, max_rate=args.max_rate or args.rate * 4)
+    exporter = None
+    if args.export_parquet:
+        # pyarrow n'est chargé que si l'export est demandé
+        from db.parquet_export import ParquetExporter
+        exporter = ParquetExporter()
+    try:
+        results = run_jobs(build_jobs(args, rate_limiter, exporter), max_parallel=args.parallel_jobs)
+    finally:
+        paths = exporter.close() if exporter else []
+    if exporter:
+        print(f"📦 {len(paths)} fichiers Parquet écrits")
+    return results, {"final_rates": rate_limiter.rates(), "parquet_files": paths}
+
+def run_cli(argv):
+    """
+    Exécute une commande ; renvoie le code de sortie (0 = succès, 1 = au moins un job en échec).
+    Un rapport JSON (jobs + métriques) est écrit en fin de run, même en cas d'échec.
+    """
+    args = build_parser().parse_args(argv)
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port)
+        print(f"📈 Métriques exposées sur :{args.metrics_port}/metrics")
+
+    started_at = datetime.now(timezone.utc)
+    run = {
+        "pipeline": run_pipeline_command,
+        "export": run_export_command,
+        "similarity": run_similarity_command,
+        "games": run_games_command,
+    }.get(args.command, run_jobs_command)
+    results, extra = run(args)
+
+    print("\n📋 RÉSUMÉ DU RUN")
+    for name, result in results.items():
+        print(f"  {name:20s} {result['status']:8s} {result['duration']}s")
+    for host, rate in extra.get("final_rates", {}).items():
+        print(f"  🚦 Débit final {host} : {rate:.2f} req/s")
+
+    report = write_run_report(args.command, results, started_at, path=args.report, extra=extra)
+    print(f"🧾 Rapport : {report}")
+    if args.metrics_file:
+        METRICS.write_textfile(args.metrics_file)
+    return 0 if all(result["status"] == "ok" for result in results.values()) else 1
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        interactive_menu()
+        return 0
+    try:
+        return run_cli(argv)
+    except KeyboardInterrupt:
+        print("\n\n👋 Scraping annulé.")
+        return 130
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
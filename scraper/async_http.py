@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import time
+import aiohttp
+
+from scraper.http_cache import get_default_cache
+from scraper.metrics import METRICS
+from scraper.rankings import SITE_URL, last_page_for, leaderboard_target, page_url, parse_ranking_page
+from scraper.profiles import parse_profile_html
+from scraper.retry import DEFAULT_POLICY, parse_retry_after, retry_reason
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+def timing_trace_config():
+    """Chronométrage aiohttp par étape (DNS, connexion, TTFB) vers le registre de métriques"""
+    config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.start = time.perf_counter()
+
+    async def on_dns_start(session, context, params):
+        context.dns_start = time.perf_counter()
+
+    async def on_dns_end(session, context, params):
+        METRICS.observe("http_dns", time.perf_counter() - context.dns_start)
+
+    async def on_connect_start(session, context, params):
+        context.connect_start = time.perf_counter()
+
+    async def on_connect_end(session, context, params):
+        METRICS.observe("http_connect", time.perf_counter() - context.connect_start)
+
+    async def on_request_end(session, context, params):
+        # Déclenché à la réception des en-têtes : time to first byte
+        METRICS.observe("http_ttfb", time.perf_counter() - context.start)
+        METRICS.inc("http_requests", status=params.response.status)
+
+    async def on_request_exception(session, context, params):
+        METRICS.inc("http_requests", status=type(params.exception).__name__)
+
+    config.on_request_start.append(on_request_start)
+    config.on_dns_resolvehost_start.append(on_dns_start)
+    config.on_dns_resolvehost_end.append(on_dns_end)
+    config.on_connection_create_start.append(on_connect_start)
+    config.on_connection_create_end.append(on_connect_end)
+    config.on_request_end.append(on_request_end)
+    config.on_request_exception.append(on_request_exception)
+    return config
+
+
+class AsyncFetcher:
+    """
+    Session aiohttp partagée par tous les scrapers :
+    connexions keep-alive réutilisées, nombre de requêtes simultanées limité, timeouts,
+    cache HTTP conditionnel (voir scraper/http_cache.py) et retry avec backoff (voir scraper/retry.py).
+    Avec `rate_limiter` (HostRateLimiter, scraper/pool.py), chaque requête réseau prend un jeton
+    de son hôte et les 429 / succès lui sont signalés : même débit adaptatif que les scrapers threadés.
+    """
+
+    def __init__(self, concurrency=8, per_host=4, timeout=20, headers=None, cache=None, retry_policy=None,
+                 rate_limiter=None):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.headers = headers or DEFAULT_HEADERS
+        self.cache = cache if cache is not None else get_default_cache()
+        self.retry_policy = retry_policy or DEFAULT_POLICY
+        self.rate_limiter = rate_limiter
+        self.session = None
+        self.semaphore = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.per_host,
+            keepalive_timeout=30
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers=self.headers,
+            trace_configs=[timing_trace_config()]
+        )
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def get_text(self, url):
+        """GET avec cache ; les erreurs transitoires sont retentées avec backoff sans bloquer la boucle"""
+        attempt = 1
+        while True:
+            try:
+                return await self._get_text(url)
+            except Exception as e:
+                retryable = isinstance(e, aiohttp.ClientConnectionError) or self.retry_policy.is_retryable(e)
+                if not retryable or attempt >= self.retry_policy.max_attempts:
+                    raise
+                delay = self.retry_policy.delay(attempt, e)
+                METRICS.inc("http_retries", reason=retry_reason(e))
+                logging.warning(f"⏳ {url} : {e} — tentative {attempt + 1}/{self.retry_policy.max_attempts} dans {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _get_text(self, url):
+        entry = await asyncio.to_thread(self.cache.lookup, url) if self.cache else None
+        if entry and entry["fresh"]:
+            METRICS.inc("http_cache", result="hit")
+            return entry["body"]
+        headers = self.cache.conditional_headers(entry) if entry else {}
+
+        if self.rate_limiter:
+            # Jeton pris avant le sémaphore : l'attente n'occupe pas de place de concurrence
+            await self.rate_limiter.acquire_async(url)
+        async with self.semaphore:
+            start = time.perf_counter()
+            async with self.session.get(url, headers=headers) as response:
+                if self.rate_limiter and response.status < 400:
+                    self.rate_limiter.succeeded(url)
+                if response.status == 304 and entry:
+                    METRICS.inc("http_cache", result="revalidated")
+                    await asyncio.to_thread(self.cache.touch, url)
+                    return entry["body"]
+                if self.cache:
+                    METRICS.inc("http_cache", result="miss")
+                if response.status == 429:
+                    METRICS.inc("http_throttled")
+                    if self.rate_limiter:
+                        self.rate_limiter.throttled(url, parse_retry_after(response.headers.get("Retry-After")))
+                response.raise_for_status()
+                download_start = time.perf_counter()
+                text = await response.text()
+                METRICS.observe("http_download", time.perf_counter() - download_start)
+                METRICS.observe("http_request", time.perf_counter() - start)
+
+        if self.cache:
+            await asyncio.to_thread(self.cache.store, url, text, response.headers)
+        return text
+
+
+async def scrape_ranking_async(fetcher, leaderboard, depth=50, site_url=SITE_URL, on_row=None):
+    """
+    Top `depth` d'un classement (clé de LEADERBOARDS ou chemin), selon les mêmes règles que
+    stream_ranking : la page 1 donne le nombre de pages, les suivantes sont récupérées en parallèle
+    (dans la limite de concurrence du fetcher). Chaque ligne est transmise à `on_row` (coroutine)
+    dès que sa page est parsée, sans attendre la fin du classement. Renvoie les lignes triées par rang.
+    """
+    path, region = leaderboard_target(leaderboard)
+    base_url = f"{site_url}{path}"
+
+    async def fetch_page(page):
+        url = page_url(base_url, page)
+        logging.info(f"🔎 Scraping {url}")
+        try:
+            html = await fetcher.get_text(url)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logging.error(f"❌ Erreur HTTP ({url}): {e}")
+            return None, []
+        rows, _, _ = await asyncio.to_thread(parse_ranking_page, html, page, region, site_url)
+        rows = [streamer for streamer in rows if streamer["rank"] <= depth]
+        if on_row:
+            for streamer in rows:
+                await on_row(streamer)
+        return html, rows
+
+    async def fetch_rows(page):
+        _, rows = await fetch_page(page)
+        return rows
+
+    html, data = await fetch_page(1)
+    if html is None:
+        return []
+    last_page = last_page_for(depth, len(data), html)
+    del html
+
+    for rows in await asyncio.gather(*(fetch_rows(page) for page in range(2, last_page + 1))):
+        data.extend(rows)
+    data.sort(key=lambda streamer: streamer["rank"])
+    return data[:depth]
+
+
+async def scrape_profile_async(fetcher, profile_url, streamer_name, rank=None):
+    """Récupère et parse un profil ; renvoie None en cas d'échec"""
+    try:
+        html = await fetcher.get_text(profile_url)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logging.error(f"❌ Erreur HTTP ({streamer_name}): {e}")
+        return None
+
+    try:
+        data = await asyncio.to_thread(parse_profile_html, html, profile_url, streamer_name)
+    except Exception as e:
+        logging.error(f"❌ Erreur parsing ({streamer_name}): {e}")
+        return None
+
+    data["rank"] = rank
+    logging.info(f"✅ Profil {streamer_name} récupéré")
+    return data
@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+CHECKPOINT_DIR = os.getenv("TWITCHTRACKER_CHECKPOINT_DIR", ".cache/checkpoints")
+# Au-delà, un checkpoint n'est plus celui d'un run interrompu mais un reste d'ancien run : il est ignoré
+CHECKPOINT_MAX_AGE_HOURS = float(os.getenv("TWITCHTRACKER_CHECKPOINT_MAX_AGE_HOURS", "12"))
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+class ScrapeCheckpoint:
+    """
+    État d'un run de scraping (pending / done / failed par chaîne), sauvegardé sur disque
+    à chaque changement avec l'identifiant et la date de début du run. Un run interrompu
+    (checkpoint encore présent et récent) reprend avec les chaînes non terminées.
+    """
+
+    def __init__(self, path, max_age_hours=CHECKPOINT_MAX_AGE_HOURS):
+        self.path = path
+        self.max_age = timedelta(hours=max_age_hours)
+        self.run_id = None
+        self.started_at = None
+        self.status = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def for_job(cls, job_name, directory=CHECKPOINT_DIR):
+        os.makedirs(directory, exist_ok=True)
+        return cls(os.path.join(directory, f"{job_name}.json"))
+
+    def _load(self):
+        """Checkpoint d'un run interrompu, ou None (absent, illisible, ancien format ou trop ancien)"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            started_at = datetime.fromisoformat(state["started_at"])
+            if datetime.now(timezone.utc) - started_at > self.max_age:
+                print(f"🗑️ Checkpoint ignoré (run {state.get('run_id')} du {started_at:%Y-%m-%d %H:%M}, trop ancien)")
+                return None
+            return state
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def resume(self, streamers):
+        """
+        Renvoie les streamers restant à traiter. Si le checkpoint d'un run interrompu existe,
+        on reprend ce run : les chaînes déjà "done" sont ignorées (les "failed" sont retentées) ;
+        sinon un nouveau run démarre.
+        """
+        state = self._load()
+        if state and state.get("status"):
+            self.run_id, self.started_at, self.status = state["run_id"], state["started_at"], state["status"]
+            remaining = [s for s in streamers if self.status.get(s.get("name")) != DONE]
+            print(f"⏯️ Reprise du run {self.run_id} : {len(streamers) - len(remaining)} déjà faits, {len(remaining)} restants")
+        else:
+            self.run_id = uuid.uuid4().hex[:12]
+            self.started_at = datetime.now(timezone.utc).isoformat()
+            self.status = {}
+            remaining = list(streamers)
+        for streamer in remaining:
+            self.status[streamer.get("name")] = PENDING
+        with self.lock:
+            self._save()
+        return remaining
+
+    def mark(self, names, status):
+        with self.lock:
+            for name in names:
+                self.status[name] = status
+            self._save()
+
+    def counts(self):
+        with self.lock:
+            values = list(self.status.values())
+        return {state: values.count(state) for state in (PENDING, DONE, FAILED)}
+
+    def finish(self):
+        """
+        Supprime le checkpoint dès qu'aucune chaîne n'est en attente : le run est allé au bout, même si
+        certaines chaînes ont échoué définitivement (404, pas d'URL de profil). Elles seront retentées par
+        le prochain run, qui repart de zéro. Un run interrompu garde son checkpoint pour être repris.
+        """
+        counts = self.counts()
+        if counts[PENDING]:
+            print(f"💾 Checkpoint conservé ({counts[PENDING]} en attente, {counts[FAILED]} en échec) : {self.path}")
+            return False
+        if counts[FAILED]:
+            print(f"⚠️ Run {self.run_id} terminé avec {counts[FAILED]} chaîne(s) en échec")
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        return True
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"run_id": self.run_id, "started_at": self.started_at, "status": self.status}, f)
+        os.replace(tmp, self.path)
+
+
+class BatchWriter:
+    """
+    Écrit des documents (profils, lignes de classement) au fil de l'eau par lots de `batch_size`
+    via `insert_func(batch) -> bool`. Avec un checkpoint, les chaînes d'un lot écrit avec succès
+    y passent à "done".
+    """
+
+    def __init__(self, insert_func, batch_size=20, checkpoint=None):
+        self.insert_func = insert_func
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.buffer = []
+        self.written = 0
+        self.failed_batches = 0
+        self.lock = threading.Lock()
+
+    def add(self, doc):
+        with self.lock:
+            self.buffer.append(doc)
+            if len(self.buffer) >= self.batch_size:
+                self._flush()
+
+    def close(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        batch, self.buffer = self.buffer, []
+        if self.insert_func(batch):
+            self.written += len(batch)
+            if self.checkpoint:
+                self.checkpoint.mark([doc["name"] for doc in batch], DONE)
+        else:
+            self.failed_batches += 1
@@ -0,0 +1,204 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import requests
+
+from scraper.metrics import METRICS
+
+CACHE_DIR = os.getenv("TWITCHTRACKER_CACHE_DIR", ".cache/http")
+CACHE_ENABLED = os.getenv("TWITCHTRACKER_HTTP_CACHE", "1") != "0"
+REQUEST_TIMEOUT = 20
+
+
+class HttpCache:
+    """
+    Cache HTTP persistant : corps gzippés sur disque, indexés par URL.
+    - Une entrée plus jeune que `ttl` est servie sans requête.
+    - Au-delà, on revalide avec If-None-Match / If-Modified-Since ; un 304 réutilise le HTML en cache.
+    - `evict()` supprime les entrées plus vieilles que `max_age` puis les plus anciennes
+      jusqu'à repasser sous `max_size` octets ; appelé aussi toutes les `evict_every` écritures,
+      pour qu'un processus de longue durée (planificateur, --parallel-jobs) ne fasse pas grossir le cache.
+    """
+
+    def __init__(self, directory=CACHE_DIR, ttl=600, max_age=7 * 24 * 3600, max_size=200 * 1024 * 1024,
+                 evict_every=500):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_size = max_size
+        self.evict_every = evict_every
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return f"{base}.json", f"{base}.html.gz"
+
+    def _write(self, path, data):
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def lookup(self, url):
+        """Renvoie l'entrée en cache ({meta..., "body", "fresh"}) ou None"""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with gzip.open(body_path, "rt", encoding="utf-8") as f:
+                meta["body"] = f.read()
+        except (OSError, ValueError):
+            return None
+        meta["fresh"] = time.time() - meta["stored_at"] < self.ttl
+        return meta
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, body, headers):
+        meta_path, body_path = self._paths(url)
+        compressed = gzip.compress(body.encode("utf-8"))
+        self._write(body_path, compressed)
+        self._write(meta_path, json.dumps({
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "stored_at": time.time(),
+            "size": len(compressed),
+        }).encode("utf-8"))
+        with self._writes_lock:
+            self._writes += 1
+            due = self.evict_every and self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def touch(self, url):
+        """Marque une entrée comme fraîche après un 304"""
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+        meta["stored_at"] = time.time()
+        self._write(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def evict(self):
+        """Supprime les entrées trop vieilles puis les plus anciennes si le cache dépasse `max_size`"""
+        now = time.time()
+        entries = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            meta_path = os.path.join(self.directory, filename)
+            body_path = meta_path[:-len(".json")] + ".html.gz"
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {"stored_at": 0, "size": 0}
+            entries.append((meta.get("stored_at", 0), meta.get("size", 0), meta_path, body_path))
+
+        entries.sort()
+        total_size = sum(size for _, size, _, _ in entries)
+        removed = 0
+        for stored_at, size, meta_path, body_path in entries:
+            if now - stored_at < self.max_age and total_size <= self.max_size:
+                break
+            for path in (meta_path, body_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total_size -= size
+            removed += 1
+        return removed
+
+    def get(self, url, headers=None, session=None, before_request=None):
+        """
+        GET avec cache ; renvoie le HTML (lève requests.HTTPError si le statut est une erreur).
+        `before_request()` n'est appelé que si une requête part sur le réseau (pas pour un hit).
+        """
+        entry = self.lookup(url)
+        if entry and entry["fresh"]:
+            METRICS.inc("http_cache", result="hit")
+            return entry["body"]
+
+        request_headers = dict(headers or {})
+        if entry:
+            request_headers.update(self.conditional_headers(entry))
+        if before_request:
+            before_request()
+
+        response = timed_get(url, request_headers, session)
+        if response.status_code == 304 and entry:
+            METRICS.inc("http_cache", result="revalidated")
+            self.touch(url)
+            return entry["body"]
+
+        METRICS.inc("http_cache", result="miss")
+        response.raise_for_status()
+        self.store(url, response.text, response.headers)
+        return response.text
+
+
+def timed_get(url, headers=None, session=None):
+    """
+    requests.get instrumenté : `elapsed` (envoi -> en-têtes reçus) donne le TTFB, connexion comprise ;
+    le reste du temps est le téléchargement du corps.
+    """
+    start = time.perf_counter()
+    try:
+        response = (session or requests).get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as e:
+        METRICS.inc("http_requests", status=type(e).__name__)
+        raise
+    total = time.perf_counter() - start
+    ttfb = response.elapsed.total_seconds()
+    METRICS.inc("http_requests", status=response.status_code)
+    METRICS.observe("http_ttfb", ttfb)
+    METRICS.observe("http_download", max(0.0, total - ttfb))
+    METRICS.observe("http_request", total)
+    return response
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Cache partagé du processus (None si désactivé via TWITCHTRACKER_HTTP_CACHE=0)"""
+    global _default_cache
+    if not CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache()
+            _default_cache.evict()
+        return _default_cache
+
+
+def fetch_html(url, headers=None, before_request=None):
+    """
+    Récupère une page en passant par le cache HTTP s'il est activé.
+    `before_request()` est appelé juste avant toute requête réseau (jamais pour un hit du cache).
+    """
+    cache = get_default_cache()
+    if cache:
+        return cache.get(url, headers, before_request=before_request)
+    if before_request:
+        before_request()
+    response = timed_get(url, headers)
+    response.raise_for_status()
+    return response.text
@@ -0,0 +1,229 @@
+import bisect
+import http.server
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+PREFIX = "twitchtracker_"
+# Bornes (secondes) des histogrammes de latence
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # dernière case : +Inf
+        self.sum = 0.0
+        self.max = 0.0
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Quantile approché : borne supérieure du bucket qui le contient"""
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (self.max,), self.counts):
+            seen += count
+            if count and seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        count = self.count
+        return {
+            "count": count,
+            "sum": round(self.sum, 4),
+            "mean": round(self.sum / count, 4) if count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 4),
+        }
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    """
+    Registre de métriques du processus, thread-safe :
+    compteurs (`inc`) et histogrammes de durée (`observe` / `timer`), avec labels.
+    Exportable au format texte Prometheus (fichier pour node_exporter / pushgateway, ou endpoint HTTP)
+    et en dict pour le rapport JSON de run.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def drain(self):
+        """Renvoie l'état courant et repart de zéro (pour remonter les métriques d'un processus fils)"""
+        with self.lock:
+            state = (self.counters, self.histograms)
+            self.counters, self.histograms = {}, {}
+        return state
+
+    def merge(self, state):
+        counters, histograms = state
+        with self.lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, histogram in histograms.items():
+                if key in self.histograms:
+                    self.histograms[key].merge(histogram)
+                else:
+                    self.histograms[key] = histogram
+
+    def reset(self):
+        self.drain()
+
+    def snapshot(self):
+        """Métriques agrégées pour le rapport JSON : {"counters": {...}, "histograms": {...}}"""
+        with self.lock:
+            counters = {
+                name + _format_labels(labels): value for (name, labels), value in sorted(self.counters.items())
+            }
+            histograms = {
+                name + _format_labels(labels): histogram.summary()
+                for (name, labels), histogram in sorted(self.histograms.items())
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self):
+        """Format d'exposition texte Prometheus"""
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+
+        typed = set()
+        for (name, labels), value in counters:
+            metric = f"{PREFIX}{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            metric = f"{PREFIX}{name}_seconds"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """
+        Écrit l'exposition Prometheus dans `path` (écriture atomique) : à lire par le textfile
+        collector de node_exporter, ou à pousser avec `curl --data-binary @path <pushgateway>`.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+    def serve(self, port, host="0.0.0.0"):
+        """Expose /metrics sur `port` dans un thread démon ; renvoie le serveur HTTP"""
+        registry = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# Registre partagé par tout le processus
+METRICS = Metrics()
+
+REPORT_DIR = os.getenv("TWITCHTRACKER_REPORT_DIR", ".cache/reports")
+
+
+def write_run_report(command, jobs, started_at, path=None, extra=None):
+    """
+    Rapport JSON d'un run : statut et durée de chaque job, métriques agrégées du processus.
+    Par défaut écrit dans REPORT_DIR/<commande>-<date>.json ; renvoie le chemin.
+    """
+    finished_at = datetime.now(timezone.utc)
+    path = path or os.path.join(REPORT_DIR, f"{command}-{started_at:%Y%m%dT%H%M%SZ}.json")
+    report = {
+        "command": command,
+        "started_at": started_at.isoformat(),
+        "finished_at": finished_at.isoformat(),
+        "duration": round((finished_at - started_at).total_seconds(), 2),
+        "jobs": jobs,
+        **(extra or {}),
+        **METRICS.snapshot(),
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    return path
@@ -0,0 +1,60 @@
+import re
+
+_SUFFIXES = {"K": 1e3, "M": 1e6, "B": 1e9}
+_NUMBER_RE = re.compile(r"^([+-]?\d+(?:\.\d+)?)([KMB]?)$", re.IGNORECASE)
+_DURATION_UNITS = {"d": 24.0, "h": 1.0, "m": 1 / 60}
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)\s*([dhm])", re.IGNORECASE)
+
+
+def parse_number(value):
+    """
+    Convertit un nombre affiché par TwitchTracker en int/float :
+    "1,234" -> 1234, "12.5K" -> 12500, "3M" -> 3000000, "+12" -> 12, "#3" -> 3, "--" / "" -> None.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    text = str(value).replace(",", "").replace(" ", "").replace("\u00a0", "").lstrip("#")
+    match = _NUMBER_RE.match(text)
+    if not match:
+        return None
+    number = float(match.group(1)) * _SUFFIXES.get(match.group(2).upper(), 1)
+    return int(number) if number.is_integer() else number
+
+
+def parse_duration(value):
+    """
+    Durée affichée par TwitchTracker en heures :
+    "5.2" -> 5.2, "3h" -> 3.0, "2h 30m" -> 2.5, "1d 2h" -> 26.0, "04:30" -> 4.5, "" / "N/A" -> None.
+    """
+    text = str(value if value is not None else "").strip()
+    units = _DURATION_RE.findall(text)
+    if units:
+        return sum(float(amount) * _DURATION_UNITS[unit.lower()] for amount, unit in units)
+    if ":" in text:
+        parts = text.split(":")
+        if all(part.isdigit() for part in parts):
+            return sum(int(part) / 60 ** i for i, part in enumerate(parts))
+    number = parse_number(value)
+    return float(number) if number is not None else None
+
+
+def parse_number_series(series):
+    """
+    Version vectorisée de parse_number pour une colonne pandas (aucune évaluation Python par cellule).
+    Les colonnes déjà numériques sont renvoyées telles quelles.
+    """
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    text = (
+        series.astype("string")
+        .str.replace(r"[,\s#]", "", regex=True)
+        .str.upper()
+    )
+    parts = text.str.extract(r"^([+-]?\d+(?:\.\d+)?)([KMB]?)$")
+    numbers = pd.to_numeric(parts[0], errors="coerce")
+    multipliers = parts[1].map({"": 1.0, **_SUFFIXES}).astype(float)
+    return (numbers * multipliers).astype(float)
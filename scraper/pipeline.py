@@ -0,0 +1,133 @@
+import functools
+import logging
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from scraper.metrics import METRICS
+from scraper.pool import HostRateLimiter
+from scraper.profiles import parse_profile_html, request_profile_html
+from scraper.retry import run_with_retries
+
+_DONE = object()
+
+
+def _init_worker():
+    # Un processus forké hérite des métriques (et du verrou) du parent : on repart d'un registre vierge
+    METRICS.__init__()
+
+
+def _parse_with_metrics(html, profile_url, streamer_name):
+    """Exécuté dans un processus fils : renvoie aussi ses métriques pour les fusionner dans le parent"""
+    data = parse_profile_html(html, profile_url, streamer_name)
+    return data, METRICS.drain()
+
+
+def scrape_profiles_pipeline(streamers, fetch_workers=4, parse_processes=None, rate=2.0,
+                             queue_size=32, emoji="📊", rate_limiter=None, on_result=None, on_failure=None,
+                             retry_policy=None):
+    """
+    Scraping des profils en deux étages découplés :
+    - téléchargement : `fetch_workers` threads produisent le HTML brut (bytes) dans une file bornée,
+      les erreurs transitoires étant remises en file selon `retry_policy` (voir scraper/retry.py) ;
+    - parsing : les extract_* tournent dans un ProcessPoolExecutor (`parse_processes` processus,
+      tous les cœurs par défaut), avec au plus `queue_size` pages en attente de parsing.
+    Quand le parsing sature, la file se remplit et bloque les téléchargements (backpressure).
+    Les profils sont renvoyés dans l'ordre des rangs.
+    `rate_limiter` permet de partager un budget de requêtes avec d'autres jobs.
+    `on_result` / `on_failure` : voir scrape_profiles dans scraper/profiles.py.
+    """
+    rate_limiter = rate_limiter or HostRateLimiter(rate)
+    total = len(streamers)
+    pages = queue.Queue(maxsize=queue_size)
+
+    def fetch(item):
+        i, streamer = item
+        name = streamer.get("name")
+        url = streamer.get("profile_url")
+
+        if not url:
+            logging.warning(f"⚠️ Pas d'URL pour {name}")
+            if on_failure:
+                on_failure(name)
+            return
+
+        logging.info(f"{emoji} [{i}/{total}] Rank #{streamer.get('rank')} - {name}")
+        html = request_profile_html(url, rate_limiter)
+        pages.put((i, streamer, html.encode("utf-8")))
+
+    def give_up(item, error):
+        name = item[1].get("name")
+        logging.error(f"❌ Échec pour {name} : {error}")
+        METRICS.inc("profiles", result="failed")
+        if on_failure:
+            on_failure(name)
+
+    def fetch_stage():
+        try:
+            run_with_retries(
+                list(enumerate(streamers, 1)), fetch, workers=fetch_workers, policy=retry_policy,
+                on_giveup=give_up, describe=lambda item: item[1].get("name")
+            )
+        finally:
+            pages.put(_DONE)
+
+    fetcher = threading.Thread(target=fetch_stage, daemon=True)
+    fetcher.start()
+
+    in_flight = threading.BoundedSemaphore(queue_size)
+    # Parsings terminés, traités par le thread d'écriture : le callback du future tourne dans le thread
+    # de gestion du ProcessPoolExecutor et ne doit rien faire de plus que déposer le résultat
+    parsed = queue.Queue()
+    results = {}
+
+    def enqueue_parsed(i, streamer, future):
+        parsed.put((i, streamer, future))
+
+    def handle_parsed(i, streamer, future):
+        name = streamer.get("name")
+        try:
+            data, metrics = future.result()
+        except Exception as e:
+            logging.error(f"❌ Erreur parsing ({name}): {e}")
+            METRICS.inc("profiles", result="failed")
+            if on_failure:
+                on_failure(name)
+            return
+        METRICS.merge(metrics)
+        METRICS.inc("profiles", result="ok")
+        data["rank"] = streamer.get("rank")
+        logging.info(f"✅ Profil {name} récupéré")
+        if on_result:
+            on_result(data)
+        else:
+            results[i] = data
+
+    def write_stage():
+        while (item := parsed.get()) is not _DONE:
+            try:
+                handle_parsed(*item)
+            except Exception as e:
+                logging.error(f"❌ Erreur à l'écriture du profil {item[1].get('name')} : {e}")
+            finally:
+                # Libéré après l'écriture : des écritures lentes freinent aussi les soumissions
+                in_flight.release()
+
+    writer = threading.Thread(target=write_stage, daemon=True)
+    writer.start()
+    try:
+        with ProcessPoolExecutor(max_workers=parse_processes, initializer=_init_worker) as executor:
+            while True:
+                item = pages.get()
+                if item is _DONE:
+                    break
+                i, streamer, html = item
+                in_flight.acquire()
+                future = executor.submit(_parse_with_metrics, html, streamer["profile_url"], streamer["name"])
+                future.add_done_callback(functools.partial(enqueue_parsed, i, streamer))
+    finally:
+        parsed.put(_DONE)
+        writer.join()
+
+    fetcher.join()
+    return [results[i] for i in sorted(results)]
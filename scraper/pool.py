@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from scraper.metrics import METRICS
+
+
+class TokenBucket:
+    """Limiteur de débit à jetons : `rate` requêtes/seconde, rafales jusqu'à `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.burst = capacity
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def set_rate(self, rate):
+        """Change le débit (les jetons déjà accumulés sont conservés)"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+            if self.burst is None:
+                self.capacity = max(1.0, self.rate)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def pause(self, seconds):
+        """Aucun jeton n'est délivré pendant `seconds` (ex. Retry-After d'un 429)"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def try_acquire(self):
+        """Prend un jeton s'il y en a un (renvoie 0) ; sinon renvoie l'attente (s) avant le prochain essai"""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Bloque jusqu'à ce qu'un jeton soit disponible"""
+        while (wait := self.try_acquire()) > 0:
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """
+    Un TokenBucket par hôte, créé à la première requête vers cet hôte.
+    Le débit s'adapte aux réponses du site (AIMD) :
+    - `throttled()` (429) multiplie le débit de l'hôte par `decrease` (au plus une fois par
+      seconde, pas en dessous de `min_rate`) et suspend l'hôte pendant le Retry-After ;
+    - `succeeded()` remonte le débit d'environ `increase` req/s par seconde jusqu'à `max_rate`
+      (par défaut `rate` : le débit initial n'est alors jamais dépassé).
+    """
+
+    def __init__(self, rate=2.0, burst=None, max_rate=None, min_rate=0.1, increase=0.25, decrease=0.5):
+        self.rate = rate
+        self.burst = burst
+        self.max_rate = max(rate, max_rate or rate)
+        self.min_rate = min(rate, min_rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.buckets = {}
+        self.decreased_at = {}
+        self.lock = threading.Lock()
+
+    def bucket_for(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def acquire(self, url):
+        with METRICS.timer("rate_limit_wait"):
+            self.bucket_for(url).acquire()
+
+    async def acquire_async(self, url):
+        """Comme acquire(), en attendant par asyncio.sleep : la boucle d'événements n'est pas bloquée"""
+        bucket = self.bucket_for(url)
+        with METRICS.timer("rate_limit_wait"):
+            while (wait := bucket.try_acquire()) > 0:
+                await asyncio.sleep(wait)
+
+    def throttled(self, url, retry_after=None):
+        """Le site a répondu 429 : diminution multiplicative du débit de l'hôte"""
+        host = urlparse(url).netloc
+        bucket = self.bucket_for(url)
+        if retry_after:
+            bucket.pause(retry_after)
+        now = time.monotonic()
+        with self.lock:
+            # Les requêtes déjà en vol reçoivent aussi des 429 : une seule baisse par salve
+            if now - self.decreased_at.get(host, 0.0) < 1.0:
+                return
+            self.decreased_at[host] = now
+        rate = max(self.min_rate, bucket.rate * self.decrease)
+        bucket.set_rate(rate)
+        logging.warning(f"🐢 429 sur {host} : débit réduit à {rate:.2f} req/s")
+
+    def succeeded(self, url):
+        """Requête réussie : augmentation additive du débit de l'hôte"""
+        bucket = self.bucket_for(url)
+        if bucket.rate < self.max_rate:
+            bucket.set_rate(min(self.max_rate, bucket.rate + self.increase / bucket.rate))
+
+    def rates(self):
+        """Débit courant de chaque hôte (req/s)"""
+        with self.lock:
+            return {host: bucket.rate for host, bucket in self.buckets.items()}
+
+
+def run_pool(items, task, workers=4):
+    """
+    Exécute `task(item)` sur un pool de `workers` threads.
+    Les résultats sont renvoyés dans l'ordre des `items` (donc dans l'ordre des rangs).
+    """
+    if workers <= 1:
+        return [task(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(task, items))
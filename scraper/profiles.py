@@ -1,23 +1,27 @@
-import requests
 from bs4 import BeautifulSoup
-from datetime import datetime, timezone
-from db.mongo_client import db
-import time
+from lxml import html as lxml_html
+from datetime import datetime, timedelta, timezone
+from db.mongo_client import get_db
+from scraper.metrics import METRICS
+from scraper.numbers import parse_number
+from scraper.pool import HostRateLimiter
+from scraper.rankings import HASHED_FIELDS, profile_url_for, ranking_row_hash
+from scraper.retry import limited_fetch, run_with_retries
 import re
 import logging
+import os
+
+PROFILE_PARSER = os.getenv("TWITCHTRACKER_PROFILE_PARSER", "lxml")
 
 # Setup logger
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
 def clean_number(text):
-    """Nettoyer et convertir un texte numérique en int si possible"""
+    """Nettoyer et convertir un texte numérique en int/float si possible"""
     if not text:
         return None
-    text = text.replace(",", "").replace(" ", "").replace("K", "*1e3").replace("M", "*1e6")
-    try:
-        return int(eval(text))
-    except Exception:
-        return text.strip()
+    number = parse_number(text)
+    return number if number is not None else text.strip()
 
 def extract_bio(soup):
     bio_div = soup.find("div", style=lambda x: x and "word-wrap:break-word" in x)
@@ -38,7 +42,7 @@ def extract_top_games(soup):
             if game_name:
                 games.append({
                     "game": game_name,
-                    "hours": hours.get_text(strip=True) if hours else "N/A"
+                    "hours": parse_number(hours.get_text(strip=True)) if hours else None
                 })
     return games
 
@@ -56,7 +60,7 @@ def extract_recent_streams(soup):
                 "date": date.get("data-dt") if date else "N/A",
                 "game": games[0] if games else "Unknown",
                 "duration": duration_div.get_text(strip=True) if duration_div else "0h",
-                "max_viewers": viewers_div[0].get_text(strip=True) if viewers_div else "0",
+                "max_viewers": parse_number(viewers_div[0].get_text(strip=True)) if viewers_div else 0,
                 "all_games": games
             })
     return streams
@@ -97,98 +101,348 @@ def extract_channel_info(soup):
                 info["status"] = status
     return info
 
-def extract_profile_data(profile_url, streamer_name, max_retries=2):
-    headers = {
-        "User-Agent": "Mozilla/5.0"
-    }
+# ---------- Parsing lxml (un seul parcours du document) ----------
+# Mêmes règles que les extract_* BeautifulSoup ci-dessus, appliquées aux seuls
+# conteneurs repérés lors d'un unique parcours de l'arbre lxml.
 
-    for attempt in range(1, max_retries + 1):
-        try:
-            logging.info(f"🔍 Scraping : {streamer_name} - {profile_url} (tentative {attempt})")
-            response = requests.get(profile_url, headers=headers)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            return {
-                "name": streamer_name,
-                "profile_url": profile_url,
-                "scraped_at": datetime.now(timezone.utc).isoformat(),
-                "bio": extract_bio(soup),
-                "top_games": extract_top_games(soup),
-                "recent_streams": extract_recent_streams(soup),
-                "additional_stats": extract_additional_stats(soup),
-                "channel_info": extract_channel_info(soup)
-            }
-
-        except requests.exceptions.HTTPError as e:
-            if response.status_code == 429 and attempt < max_retries:
-                logging.warning(f"⏳ Trop de requêtes (429). Attente 60s avant retry...")
-                time.sleep(60)
-            else:
-                logging.error(f"❌ Erreur HTTP ({streamer_name}): {e}")
-                break
-        except Exception as e:
-            logging.error(f"❌ Erreur scraping/parsing ({streamer_name}): {e}")
-            break
+def _has_class(el, name):
+    return name in (el.get("class") or "").split()
+
+def _text(el):
+    """Équivalent de get_text(strip=True)"""
+    return "".join(_iter_text(el))
 
+def _iter_text(el):
+    if el.text and el.tag not in ("script", "style"):
+        yield el.text.strip()
+    for child in el:
+        if isinstance(child.tag, str):
+            yield from _iter_text(child)
+        if child.tail:
+            yield child.tail.strip()
+
+def _string(el):
+    """Équivalent de la propriété .string de BeautifulSoup"""
+    children = list(el)
+    if not children:
+        return el.text
+    if len(children) == 1 and not el.text and not children[0].tail:
+        child = children[0]
+        return _string(child) if isinstance(child.tag, str) else child.text
     return None
 
-def scrape_all_profiles_fr():
-    streamers = list(db["viewership_fr"].find({}, {"name": 1, "profile_url": 1, "rank": 1}))
-    logging.info(f"🎯 {len(streamers)} streamers français trouvés dans la base")
+def _find(el, tag, cls=None, attr=None):
+    for node in el.iterdescendants(tag):
+        if cls and not _has_class(node, cls):
+            continue
+        if attr and node.get(attr) is None:
+            continue
+        return node
+    return None
 
-    profiles_data = []
-    for i, streamer in enumerate(streamers, 1):
-        name = streamer.get("name")
-        url = streamer.get("profile_url")
-        rank = streamer.get("rank")
+def _find_all(el, tag, cls=None, attr=None):
+    return [
+        node for node in el.iterdescendants(tag)
+        if (not cls or _has_class(node, cls)) and (not attr or node.get(attr) is not None)
+    ]
 
-        if not url:
-            logging.warning(f"⚠️ Pas d'URL pour {name}")
+def _collect_sections(root):
+    """Repère en un seul parcours tous les conteneurs utilisés par les extracteurs"""
+    sections = {"bio": None, "games": None, "streams": None, "profile": None, "blocks": [], "tables": []}
+    for el in root.iter("div", "table"):
+        if el.tag == "table":
+            if _has_class(el, "table"):
+                sections["tables"].append(el)
             continue
+        el_id = el.get("id")
+        if el_id == "channel-games" and sections["games"] is None:
+            sections["games"] = el
+        elif el_id == "channel-streams" and sections["streams"] is None:
+            sections["streams"] = el
+        if _has_class(el, "g-x-s-block"):
+            sections["blocks"].append(el)
+        if sections["bio"] is None and "word-wrap:break-word" in (el.get("style") or ""):
+            sections["bio"] = el
+        if sections["profile"] is None and _string(el) == "Streamer Profile":
+            sections["profile"] = el
+    return sections
 
-        logging.info(f"📊 [{i}/{len(streamers)}] Rank #{rank} - {name}")
-        data = extract_profile_data(url, name)
+def _lxml_bio(sections):
+    if sections["bio"] is not None:
+        return re.sub(r'\[email protected\]', '', _text(sections["bio"]))
+    return None
 
-        if data:
-            data["rank"] = rank
-            profiles_data.append(data)
-            logging.info(f"✅ Profil {name} récupéré")
-        else:
-            logging.error(f"❌ Échec pour {name}")
+def _lxml_top_games(sections):
+    games = []
+    container = sections["games"]
+    if container is not None:
+        for link in _find_all(container, "a", cls="entity")[:5]:
+            title_div = _find(link, "div", attr="title")
+            game_name = title_div.get("title") if title_div is not None else None
+            hours = _find(link, "span", cls="to-time")
+            if game_name:
+                games.append({
+                    "game": game_name,
+                    "hours": parse_number(_text(hours)) if hours is not None else None
+                })
+    return games
 
-        time.sleep(1.5)
+def _lxml_recent_streams(sections):
+    streams = []
+    container = sections["streams"]
+    if container is not None:
+        for link in _find_all(container, "a", cls="entity-line")[:10]:
+            date = _find(link, "div", attr="data-dt")
+            viewers_div = _find_all(link, "div", cls="to-number-lg")
+            duration_div = _find(link, "div", cls="to-time-lg")
+            games = [img.get("title") for img in _find_all(link, "img", attr="title") if img.get("title")]
+            streams.append({
+                "date": date.get("data-dt") if date is not None else "N/A",
+                "game": games[0] if games else "Unknown",
+                "duration": _text(duration_div) if duration_div is not None else "0h",
+                "max_viewers": parse_number(_text(viewers_div[0])) if viewers_div else 0,
+                "all_games": games
+            })
+    return streams
 
-    return profiles_data
+def _lxml_additional_stats(sections):
+    stats = {}
+    for block in sections["blocks"]:
+        value = _find(block, "div", cls="to-number")
+        if value is None:
+            value = _find(block, "div", cls="g-x-s-value")
+        label = _find(block, "div", cls="g-x-s-label")
+        if value is not None and label is not None:
+            key = _text(label).lower().replace(" ", "_")
+            stats[key] = clean_number(_text(value))
+    for table in sections["tables"]:
+        for row in table.iterdescendants("tr"):
+            cols = list(row.iterdescendants("td"))
+            if len(cols) == 2:
+                key = _text(cols[0]).lower().replace(" ", "_").replace(":", "")
+                stats[key] = clean_number(_text(cols[1]))
+    return stats
 
-def scrape_all_profiles_world(limit=None):
-    query = db["viewership_world"].find({}, {"name": 1, "profile_url": 1, "rank": 1}).sort("rank", 1)
-    if limit:
-        query = query.limit(limit)
+def _lxml_channel_info(sections):
+    info = {}
+    section = sections["profile"]
+    if section is not None and section.getparent() is not None and section.getparent().getparent() is not None:
+        container = section.getparent().getparent()
+        lang = next((a for a in container.iterdescendants("a") if "/languages/" in (a.get("href") or "")), None)
+        if lang is not None:
+            info["language"] = _text(lang)
+        date_spans = _find_all(container, "span", cls="to-date")
+        if date_spans:
+            info["created_date"] = _text(date_spans[0])
+        for s in _find_all(container, "span", cls="label-soft"):
+            status = _text(s)
+            if status in ["Partner", "Affiliate"]:
+                info["status"] = status
+    return info
 
-    streamers = list(query)
-    logging.info(f"🌍 {len(streamers)} streamers mondiaux trouvés dans la base")
+def extract_profile_sections_lxml(html):
+    """Parse une page profil avec lxml et renvoie les cinq champs extraits"""
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    with METRICS.timer("parse", kind="profile", stage="parse"):
+        sections = _collect_sections(lxml_html.fromstring(html))
+    with METRICS.timer("parse", kind="profile", stage="extract"):
+        return {
+            "bio": _lxml_bio(sections),
+            "top_games": _lxml_top_games(sections),
+            "recent_streams": _lxml_recent_streams(sections),
+            "additional_stats": _lxml_additional_stats(sections),
+            "channel_info": _lxml_channel_info(sections)
+        }
+
+def extract_profile_sections_bs4(html):
+    """Parse une page profil avec BeautifulSoup (html.parser) et renvoie les cinq champs extraits"""
+    with METRICS.timer("parse", kind="profile", stage="parse"):
+        soup = BeautifulSoup(html, "html.parser")
+    with METRICS.timer("parse", kind="profile", stage="extract"):
+        return {
+            "bio": extract_bio(soup),
+            "top_games": extract_top_games(soup),
+            "recent_streams": extract_recent_streams(soup),
+            "additional_stats": extract_additional_stats(soup),
+            "channel_info": extract_channel_info(soup)
+        }
+
+def parse_profile_html(html, profile_url, streamer_name, parser=None):
+    """
+    Construit le document profil à partir du HTML d'une page de streamer.
+    `parser` : "lxml" (par défaut, voir TWITCHTRACKER_PROFILE_PARSER) ou "html.parser".
+    """
+    parser = parser or PROFILE_PARSER
+    if parser == "lxml":
+        sections = extract_profile_sections_lxml(html)
+    else:
+        sections = extract_profile_sections_bs4(html)
+
+    return {
+        "name": streamer_name,
+        "profile_url": profile_url,
+        "scraped_at": datetime.now(timezone.utc).isoformat(),
+        **sections
+    }
+
+PROFILE_HEADERS = {
+    "User-Agent": "Mozilla/5.0"
+}
 
-    profiles_data = []
-    for i, streamer in enumerate(streamers, 1):
+def request_profile_html(profile_url, rate_limiter=None):
+    """Une tentative de téléchargement : les erreurs HTTP/réseau remontent à la politique de retry"""
+    return limited_fetch(profile_url, headers=PROFILE_HEADERS, rate_limiter=rate_limiter)
+
+def scrape_profiles(streamers, workers=4, rate=2.0, emoji="📊", parse_processes=0, rate_limiter=None,
+                    on_result=None, on_failure=None, retry_policy=None):
+    """
+    Scrape les profils en parallèle (`workers` threads) en respectant
+    `rate` requêtes/seconde par hôte. Les profils sont renvoyés dans l'ordre des rangs.
+    Avec `parse_processes` > 0, le parsing est déporté dans un pool de processus
+    (voir scraper/pipeline.py). `rate_limiter` permet de partager un budget de requêtes entre jobs.
+    Avec `on_result`, chaque profil est transmis dès qu'il est prêt et n'est pas conservé
+    (la liste renvoyée est alors vide) ; `on_failure(name)` est appelé pour chaque échec.
+    Les erreurs transitoires sont remises en file selon `retry_policy` (voir scraper/retry.py).
+    """
+    if parse_processes:
+        from scraper.pipeline import scrape_profiles_pipeline
+        return scrape_profiles_pipeline(
+            streamers, fetch_workers=workers, parse_processes=parse_processes, rate=rate, emoji=emoji,
+            rate_limiter=rate_limiter, on_result=on_result, on_failure=on_failure, retry_policy=retry_policy
+        )
+
+    rate_limiter = rate_limiter or HostRateLimiter(rate)
+    total = len(streamers)
+
+    def task(item):
+        i, streamer = item
         name = streamer.get("name")
         url = streamer.get("profile_url")
         rank = streamer.get("rank")
 
         if not url:
             logging.warning(f"⚠️ Pas d'URL pour {name}")
-            continue
+            if on_failure:
+                on_failure(name)
+            return None
+
+        logging.info(f"{emoji} [{i}/{total}] Rank #{rank} - {name}")
+        html = request_profile_html(url, rate_limiter)
+
+        try:
+            data = parse_profile_html(html, url, name)
+        except Exception as e:
+            logging.error(f"❌ Erreur parsing ({name}): {e}")
+            METRICS.inc("profiles", result="failed")
+            if on_failure:
+                on_failure(name)
+            return None
 
-        logging.info(f"🌐 [{i}/{len(streamers)}] Rank #{rank} - {name}")
-        data = extract_profile_data(url, name)
+        METRICS.inc("profiles", result="ok")
+        data["rank"] = rank
+        logging.info(f"✅ Profil {name} récupéré")
+        if on_result:
+            on_result(data)
+            return None
+        return data
 
-        if data:
-            data["rank"] = rank
-            profiles_data.append(data)
-            logging.info(f"✅ Profil {name} récupéré")
-        else:
-            logging.error(f"❌ Échec pour {name}")
+    def give_up(item, error):
+        name = item[1].get("name")
+        logging.error(f"❌ Échec pour {name} : {error}")
+        METRICS.inc("profiles", result="failed")
+        if on_failure:
+            on_failure(name)
+
+    results = run_with_retries(
+        list(enumerate(streamers, 1)), task, workers=workers, policy=retry_policy,
+        on_giveup=give_up, describe=lambda item: item[1].get("name")
+    )
+    return [data for data in results if data]
+
+RANKING_PROJECTION = {"name": 1, "profile_url": 1, **{field: 1 for field in HASHED_FIELDS}}
+
+def select_stale_streamers(streamers, max_age_hours=24):
+    """
+    Mode incrémental : ne garde que les streamers dont la ligne de classement a changé
+    depuis le dernier scraping du profil, ou dont le profil a plus de `max_age_hours`.
+    """
+    names = [streamer.get("name") for streamer in streamers]
+    watermarks = {
+        doc["name"]: doc
+        for doc in get_db()["profiles"].find(
+            {"name": {"$in": names}},
+            {"name": 1, "ranking_hash": 1, "last_profile_scrape": 1}
+        )
+    }
+    oldest = (datetime.now(timezone.utc) - timedelta(hours=max_age_hours)).isoformat()
+
+    stale = []
+    for streamer in streamers:
+        previous = watermarks.get(streamer.get("name"))
+        if (
+            not previous
+            or previous.get("ranking_hash") != ranking_row_hash(streamer)
+            or (previous.get("last_profile_scrape") or "") < oldest
+        ):
+            stale.append(streamer)
+
+    logging.info(f"♻️ Mode incrémental : {len(stale)}/{len(streamers)} profils à rafraîchir")
+    return stale
+
+def _scrape_ranked_profiles(streamers, incremental, max_age_hours, on_result=None, checkpoint=None, on_failure=None,
+                            **kwargs):
+    """
+    Scrape les profils en enregistrant l'empreinte de classement et la date de scraping.
+    Avec `checkpoint` (voir scraper/checkpoint.py), seuls les streamers non terminés
+    lors d'un run précédent interrompu sont traités, et les échecs y sont notés.
+    `on_failure(name)` est appelé pour chaque profil en échec.
+    """
+    if incremental:
+        streamers = select_stale_streamers(streamers, max_age_hours)
+    if checkpoint:
+        streamers = checkpoint.resume(streamers)
+
+    hashes = {streamer.get("name"): ranking_row_hash(streamer) for streamer in streamers}
+
+    def stamp(data):
+        data["ranking_hash"] = hashes.get(data["name"])
+        data["last_profile_scrape"] = datetime.now(timezone.utc).isoformat()
+        return data
+
+    def failed(name):
+        if checkpoint:
+            checkpoint.mark([name], "failed")
+        if on_failure:
+            on_failure(name)
+
+    profiles_data = scrape_profiles(
+        streamers,
+        on_result=(lambda data: on_result(stamp(data))) if on_result else None,
+        on_failure=failed if checkpoint or on_failure else None,
+        **kwargs
+    )
+    return [stamp(data) for data in profiles_data]
+
+def scrape_all_profiles(collection_name, limit=None, workers=4, rate=2.0, parse_processes=0, incremental=False,
+                        max_age_hours=24, rate_limiter=None, on_result=None, checkpoint=None, on_failure=None,
+                        emoji="👤"):
+    """Profils des streamers d'un classement stocké (viewership_fr, viewership_en…), par rang"""
+    query = get_db()[collection_name].find({}, RANKING_PROJECTION).sort("rank", 1)
+    if limit:
+        query = query.limit(limit)
+
+    streamers = list(query)
+    for streamer in streamers:
+        streamer["profile_url"] = profile_url_for(streamer)  # sur SITE_URL, pas l'hôte stocké
+    logging.info(f"{emoji} {len(streamers)} streamers trouvés dans '{collection_name}'")
+    return _scrape_ranked_profiles(
+        streamers, incremental, max_age_hours, on_result=on_result, checkpoint=checkpoint, on_failure=on_failure,
+        workers=workers, rate=rate, emoji=emoji, parse_processes=parse_processes, rate_limiter=rate_limiter
+    )
 
-        time.sleep(1.5)
+def scrape_all_profiles_fr(**kwargs):
+    return scrape_all_profiles("viewership_fr", emoji="📊", **kwargs)
 
-    return profiles_data
+def scrape_all_profiles_world(**kwargs):
+    return scrape_all_profiles("viewership_world", emoji="🌐", **kwargs)
@@ -0,0 +1,391 @@
+from datetime import datetime
+from html.parser import HTMLParser
+import hashlib
+import json
+import math
+import os
+import queue
+import re
+import threading
+from urllib.parse import urlsplit
+
+from scraper.metrics import METRICS
+from scraper.numbers import parse_number
+from scraper.pool import HostRateLimiter
+from scraper.retry import call_with_retries, limited_fetch, run_with_retries
+
+SITE_URL = os.getenv("TWITCHTRACKER_SITE_URL", "https://twitchtracker.com")
+ROWS_PER_PAGE = 50
+# Taille des morceaux de HTML passés au parseur incrémental
+PARSE_CHUNK_SIZE = 16384
+VOID_TAGS = frozenset({"img", "br", "hr", "input", "meta", "link", "source", "wbr"})
+
+# Classements connus : clé -> chemin TwitchTracker et région stockée dans les documents.
+# Un classement par langue suit le schéma /channels/viewership/<langue>.
+LEADERBOARDS = {
+    "fr": {"path": "/channels/viewership/french", "region": None},
+    "world": {"path": "/channels/viewership", "region": "world"},
+    "en": {"path": "/channels/viewership/english", "region": "en"},
+    "es": {"path": "/channels/viewership/spanish", "region": "es"},
+    "de": {"path": "/channels/viewership/german", "region": "de"},
+    "pt": {"path": "/channels/viewership/portuguese", "region": "pt"},
+    "it": {"path": "/channels/viewership/italian", "region": "it"},
+    "ja": {"path": "/channels/viewership/japanese", "region": "ja"},
+    "ko": {"path": "/channels/viewership/korean", "region": "ko"},
+    "ru": {"path": "/channels/viewership/russian", "region": "ru"},
+    "pl": {"path": "/channels/viewership/polish", "region": "pl"},
+    "tr": {"path": "/channels/viewership/turkish", "region": "tr"},
+}
+FR_PATH = LEADERBOARDS["fr"]["path"]
+WORLD_PATH = LEADERBOARDS["world"]["path"]
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# Champs d'une ligne de classement dont la modification justifie de re-scraper le profil
+HASHED_FIELDS = ("rank", "avg_viewers", "hours_streamed", "max_viewers", "followers_gain", "total_followers")
+
+
+def ranking_row_hash(row):
+    """Empreinte du contenu d'une ligne de classement (indépendante de scraped_at / page)"""
+    payload = json.dumps([row.get(field) for field in HASHED_FIELDS], default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def profile_url_for(streamer, site_url=SITE_URL):
+    """
+    URL du profil sur `site_url`, quel que soit l'hôte de l'URL stockée (ex. celle d'un rejeu) :
+    seul le chemin (/<login>) est repris, à défaut /<nom>. Le nom affiché peut différer du login.
+    """
+    path = urlsplit(streamer.get("profile_url") or "").path
+    if not path.strip("/"):
+        name = streamer.get("name")
+        if not name:
+            return None
+        path = f"/{name}"
+    return f"{site_url}{path}"
+
+
+def parse_ranking_row(cols, page, region=None, site_url=SITE_URL):
+    """
+    Convertit les cellules <td> d'une ligne de classement en dict (compteurs typés int/float).
+    Renvoie None si la ligne n'est pas une ligne de streamer (pub, en-tête…).
+    """
+    if len(cols) < 6:
+        return None
+
+    rank_raw = cols[0].text.strip().replace("#", "")
+    if not rank_raw.isdigit():
+        return None
+    rank = int(rank_raw)
+
+    profile_link = cols[1].find("a")["href"]
+    profile_url = f"{site_url}{profile_link}"
+    avatar_img = cols[1].find("img")
+    avatar_url = avatar_img["src"] if avatar_img else None
+    name = cols[2].text.strip()
+
+    avg_viewers = parse_number(cols[3].text.strip())
+    hours_streamed_span = cols[4].find("span")
+    hours_streamed = parse_number(hours_streamed_span.text.strip() if hours_streamed_span else cols[4].text.strip())
+    max_viewers = parse_number(cols[5].text.strip())
+    total_minutes_watched = parse_number(cols[6].text.strip()) if len(cols) > 6 else None
+    global_rank = parse_number(cols[7].text.strip()) if len(cols) > 7 else None
+    followers_gain = parse_number(cols[8].text.strip()) if len(cols) > 8 else None
+    total_followers = parse_number(cols[9].text.strip()) if len(cols) > 9 else None
+    total_views = parse_number(cols[10].text.strip()) if len(cols) > 10 else None
+
+    data = {
+        "rank": rank,
+        "name": name,
+        "profile_url": profile_url,
+        "avatar_url": avatar_url,
+        "avg_viewers": avg_viewers,
+        "hours_streamed": hours_streamed,
+        "max_viewers": max_viewers,
+        "total_minutes_watched": total_minutes_watched,
+        "global_rank": global_rank,
+        "followers_gain": followers_gain,
+        "total_followers": total_followers,
+        "total_views": total_views,
+        "page": page,
+    }
+    if region:
+        data["region"] = region
+    data["scraped_at"] = datetime.utcnow().isoformat()
+    return data
+
+
+class _Element:
+    """Élément d'une cellule : le sous-ensemble de l'API bs4 utilisé par parse_ranking_row"""
+
+    __slots__ = ("attrs", "parts", "children")
+
+    def __init__(self, attrs=()):
+        self.attrs = dict(attrs)
+        self.parts = []
+        self.children = {}
+
+    @property
+    def text(self):
+        return "".join(self.parts)
+
+    def find(self, name):
+        """Premier élément `name` de la cellule (None sinon)"""
+        return self.children.get(name)
+
+    def __getitem__(self, key):
+        return self.attrs[key]
+
+
+class RankingRowParser(HTMLParser):
+    """
+    Parseur incrémental (SAX) des lignes de classement : seuls les <tr> des <tbody> sont
+    conservés, sous forme de listes de cellules légères ; aucun DOM de la page n'est construit.
+    `feed()` accepte la page par morceaux ; `pop_rows()` renvoie les lignes terminées depuis
+    le dernier appel. `finished` passe à True à la fermeture d'un <tbody> qui contenait des lignes :
+    tout ce qui suit est ignoré, quel que soit le découpage de la page en morceaux.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tbody_depth = 0
+        self.row = None
+        self.cell = None
+        self.open = []  # (tag, élément) ouverts dans la cellule courante
+        self.rows = []
+        self.row_count = 0
+        self.finished = False
+
+    def pop_rows(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def close(self):
+        super().close()
+        if not self.finished:
+            self._end_row()  # dernière ligne d'une page tronquée
+
+    def handle_starttag(self, tag, attrs):
+        if self.finished:
+            return
+        if tag == "tbody":
+            self.tbody_depth += 1
+        elif not self.tbody_depth:
+            return
+        elif tag == "tr":
+            self._end_row()
+            self.row = []
+        elif tag == "td":
+            if self.row is not None:
+                self._end_cell()
+                self.cell = _Element(attrs)
+                self.row.append(self.cell)
+        elif self.cell is not None:
+            element = _Element(attrs)
+            self.cell.children.setdefault(tag, element)
+            if tag not in VOID_TAGS:
+                self.open.append((tag, element))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self.finished or not self.tbody_depth:
+            return
+        if tag == "tbody":
+            self._end_row()
+            self.tbody_depth -= 1
+            self.finished = self.finished or (not self.tbody_depth and self.row_count > 0)
+        elif tag == "tr":
+            self._end_row()
+        elif tag == "td":
+            self._end_cell()
+        else:
+            for i in range(len(self.open) - 1, -1, -1):
+                if self.open[i][0] == tag:
+                    del self.open[i:]
+                    break
+
+    def handle_data(self, data):
+        if self.cell is not None and not self.finished:
+            self.cell.parts.append(data)
+            for _, element in self.open:
+                element.parts.append(data)
+
+    def _end_cell(self):
+        self.cell = None
+        self.open = []
+
+    def _end_row(self):
+        self._end_cell()
+        if self.row is not None:
+            self.rows.append(self.row)
+            self.row_count += 1
+            self.row = None
+
+
+def iter_ranking_rows(html, page, region=None, site_url=SITE_URL, counts=None):
+    """
+    Générateur des lignes typées d'une page de classement, au fil du parsing.
+    `html` : la page entière ou un itérable de morceaux. Le parsing commence au premier <tbody>
+    et s'arrête à la fin du tableau. `counts` (dict optionnel) reçoit "rows" et "skipped".
+    """
+    chunks = html
+    if isinstance(html, str):
+        start = html.find("<tbody")
+        chunks = [] if start < 0 else (html[i:i + PARSE_CHUNK_SIZE] for i in range(start, len(html), PARSE_CHUNK_SIZE))
+    counts = counts if counts is not None else {}
+    counts.setdefault("rows", 0)
+    counts.setdefault("skipped", 0)
+
+    parser = RankingRowParser()
+
+    def extract():
+        for cols in parser.pop_rows():
+            counts["rows"] += 1
+            try:
+                streamer = parse_ranking_row(cols, page, region, site_url)
+            except Exception as e:
+                print(f"[❌] Exception à la page {page}, ligne {counts['rows']} : {e}")
+                counts["skipped"] += 1
+                continue
+            if streamer:
+                yield streamer
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from extract()
+        if parser.finished:
+            return
+    parser.close()
+    yield from extract()
+
+
+def parse_ranking_page(html, page, region=None, site_url=SITE_URL):
+    """
+    Parse une page de classement et renvoie (lignes, nb_lignes_html, nb_ignorées)
+    """
+    counts = {}
+    with METRICS.timer("parse", kind="ranking", stage="parse"):
+        data = list(iter_ranking_rows(html, page, region, site_url, counts))
+    METRICS.inc("ranking_rows", len(data), result="parsed")
+    METRICS.inc("ranking_rows", counts["skipped"], result="skipped")
+    return data, counts["rows"], counts["skipped"]
+
+
+def parse_page_count(html):
+    """Nombre de pages annoncé par la pagination (None si introuvable)"""
+    pages = [int(n) for n in re.findall(r'[?&]page=(\d+)', html)]
+    return max(pages) if pages else None
+
+
+def page_url(base_url, page):
+    return f"{base_url}?page={page}" if page > 1 else base_url
+
+
+def leaderboard_target(leaderboard):
+    """(chemin, région) d'un classement : clé de LEADERBOARDS ou chemin (ex. "/channels/viewership/french")"""
+    board = LEADERBOARDS.get(leaderboard, {"path": leaderboard, "region": None})
+    return board["path"], board["region"]
+
+
+def last_page_for(depth, first_page_rows, html):
+    """Dernière page à récupérer pour le top `depth`, d'après la page 1 (lignes retenues, pagination annoncée)"""
+    pages_needed = math.ceil(depth / (first_page_rows or ROWS_PER_PAGE))
+    available = parse_page_count(html)
+    return min(pages_needed, available) if available else pages_needed
+
+
+def stream_ranking(leaderboard, depth=50, workers=4, rate=2.0, site_url=SITE_URL, rate_limiter=None,
+                   retry_policy=None):
+    """
+    Générateur des lignes du top `depth` d'un classement TwitchTracker, émises dès que leur page
+    est parsée (dans l'ordre d'arrivée des pages, pas dans l'ordre des rangs).
+    `leaderboard` : clé de LEADERBOARDS ou chemin (ex. "/channels/viewership/french").
+    La page 1 donne le nombre de pages ; les suivantes sont récupérées en parallèle dans un thread
+    de fond et passées au consommateur par une file bornée : la mémoire ne dépend pas de `depth`.
+    Les erreurs transitoires (429, 5xx, timeouts) sont retentées selon `retry_policy`.
+    """
+    path, region = leaderboard_target(leaderboard)
+    base_url = f"{site_url}{path}"
+    rate_limiter = rate_limiter or HostRateLimiter(rate)
+    rows = queue.Queue(maxsize=ROWS_PER_PAGE * 2)
+    stop = threading.Event()
+    totals = {"skipped": 0, "yielded": 0}
+    totals_lock = threading.Lock()
+    done = object()
+
+    def fetch(page):
+        print(f"🔎 Scraping page {page} ({path})...")
+        return limited_fetch(page_url(base_url, page), headers=HEADERS, rate_limiter=rate_limiter)
+
+    def parse(html, page):
+        data, row_count, skipped = parse_ranking_page(html, page, region, site_url)
+        with totals_lock:
+            totals["skipped"] += skipped
+        print(f"📄 Page {page} : {row_count} lignes détectées")
+        return [streamer for streamer in data if streamer["rank"] <= depth]
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                rows.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def fetch_and_parse(page):
+        if stop.is_set():
+            return None
+        html = fetch(page)
+        for streamer in parse(html, page):
+            put(streamer)
+        return page
+
+    def give_up(page, error):
+        print(f"[❌] Erreur HTTP à la page {page} : {error}")
+
+    try:
+        html = call_with_retries(lambda: fetch(1), retry_policy, "Page 1")
+    except Exception as e:
+        give_up(1, e)
+        return
+
+    first_page = parse(html, 1)
+    totals["yielded"] += len(first_page)
+    yield from first_page
+
+    last_page = last_page_for(depth, len(first_page), html)
+    del html
+
+    def background():
+        try:
+            run_with_retries(
+                list(range(2, last_page + 1)), fetch_and_parse, workers=workers, policy=retry_policy,
+                on_giveup=give_up, describe=lambda page: f"Page {page}"
+            )
+        finally:
+            put(done)
+
+    if last_page > 1:
+        threading.Thread(target=background, daemon=True).start()
+        try:
+            while (streamer := rows.get()) is not done:
+                totals["yielded"] += 1
+                yield streamer
+        finally:
+            # Consommateur arrêté avant la fin : les pages restantes ne sont pas récupérées
+            stop.set()
+
+    print(f"\n✅ Scraping terminé : {totals['yielded']} streamers récupérés")
+    print(f"🚫 Total ignoré/skippé : {totals['skipped']} lignes")
+
+
+def scrape_ranking(leaderboard, depth=50, workers=4, rate=2.0, site_url=SITE_URL, rate_limiter=None,
+                   retry_policy=None):
+    """Top `depth` d'un classement, trié par rang (voir stream_ranking pour un traitement au fil de l'eau)"""
+    return sorted(
+        stream_ranking(leaderboard, depth, workers, rate, site_url, rate_limiter, retry_policy),
+        key=lambda streamer: streamer["rank"]
+    )[:depth]
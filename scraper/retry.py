@@ -0,0 +1,193 @@
+import email.utils
+import heapq
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+from scraper.http_cache import fetch_html
+from scraper.metrics import METRICS
+
+# Statuts transitoires : trop de requêtes et erreurs serveur
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+RETRYABLE_ERRORS = (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)
+
+
+def status_of(error):
+    """Statut HTTP porté par une exception requests / aiohttp (None sinon)"""
+    response = getattr(error, "response", None)
+    if response is not None:
+        return getattr(response, "status_code", None)
+    return getattr(error, "status", None)
+
+
+def parse_retry_after(value):
+    """Valeur d'un en-tête Retry-After (secondes ou date HTTP) en secondes ; None si absente/illisible"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def retry_reason(error):
+    """Label de métrique : statut HTTP ou type d'erreur réseau"""
+    return status_of(error) or type(error).__name__
+
+
+def retry_after_of(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response if response is not None else error, "headers", None)
+    return parse_retry_after(headers.get("Retry-After")) if headers else None
+
+
+class RetryPolicy:
+    """
+    Politique de retry partagée par les scrapers :
+    - sont retentés les 429, les 5xx, les timeouts et les erreurs de connexion ;
+    - le délai suit un backoff exponentiel avec jitter (tiré entre 0 et base * 2^(n-1), plafonné
+      à `max_delay`), sans jamais être plus court que le Retry-After renvoyé par le site.
+    """
+
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=120.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def is_retryable(self, error):
+        return isinstance(error, RETRYABLE_ERRORS) or status_of(error) in RETRYABLE_STATUS
+
+    def should_retry(self, error, attempt):
+        return attempt < self.max_attempts and self.is_retryable(error)
+
+    def delay(self, attempt, error=None):
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        retry_after = retry_after_of(error) if error is not None else None
+        return max(backoff, retry_after) if retry_after is not None else backoff
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+def limited_fetch(url, headers=None, rate_limiter=None):
+    """
+    Une tentative de téléchargement via le cache HTTP, en passant par `rate_limiter`
+    (HostRateLimiter) à qui l'on signale les 429 et les succès pour qu'il ajuste son débit.
+    Un hit du cache ne consomme pas de jeton et ne compte pas comme un succès : seules
+    les réponses du site font évoluer le débit.
+    """
+    requested = []
+
+    def before_request():
+        requested.append(True)
+        if rate_limiter:
+            rate_limiter.acquire(url)
+
+    try:
+        html = fetch_html(url, headers=headers, before_request=before_request)
+    except requests.HTTPError as e:
+        if status_of(e) == 429:
+            METRICS.inc("http_throttled")
+            if rate_limiter:
+                rate_limiter.throttled(url, retry_after_of(e))
+        raise
+    if rate_limiter and requested:
+        rate_limiter.succeeded(url)
+    return html
+
+
+def call_with_retries(func, policy=None, label="Requête"):
+    """
+    Appelle `func()` en retentant les erreurs transitoires selon `policy`.
+    Bloquant : réservé aux appels isolés (dans un pool, utiliser run_with_retries).
+    """
+    policy = policy or DEFAULT_POLICY
+    attempt = 1
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if not policy.should_retry(e, attempt):
+                raise
+            delay = policy.delay(attempt, e)
+            METRICS.inc("http_retries", reason=retry_reason(e))
+            logging.warning(f"⏳ {label} : {e} — tentative {attempt + 1}/{policy.max_attempts} dans {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def run_with_retries(items, task, workers=4, policy=None, on_giveup=None, describe=str):
+    """
+    Comme run_pool, mais un élément en échec transitoire est remis en file avec son délai
+    de backoff au lieu de bloquer son thread : les autres éléments avancent pendant l'attente.
+    Les résultats sont renvoyés dans l'ordre des `items` ; un élément abandonné (erreur non
+    transitoire ou tentatives épuisées) vaut None et est signalé à `on_giveup(item, error)`.
+    """
+    policy = policy or DEFAULT_POLICY
+    results = [None] * len(items)
+    ready = [(0.0, index, 1) for index in range(len(items))]  # (prêt à, index, tentative)
+    running = 0
+    condition = threading.Condition()
+
+    def next_item():
+        nonlocal running
+        with condition:
+            while True:
+                if not ready:
+                    if not running:
+                        return None
+                    condition.wait()
+                    continue
+                wait = ready[0][0] - time.monotonic()
+                if wait <= 0:
+                    running += 1
+                    return heapq.heappop(ready)
+                condition.wait(wait)
+
+    def worker():
+        nonlocal running
+        while True:
+            entry = next_item()
+            if entry is None:
+                return
+            _, index, attempt = entry
+            item = items[index]
+            try:
+                results[index] = task(item)
+            except Exception as e:
+                if policy.should_retry(e, attempt):
+                    delay = policy.delay(attempt, e)
+                    METRICS.inc("http_retries", reason=retry_reason(e))
+                    logging.warning(
+                        f"⏳ {describe(item)} : {e} — tentative {attempt + 1}/{policy.max_attempts} dans {delay:.1f}s"
+                    )
+                    with condition:
+                        heapq.heappush(ready, (time.monotonic() + delay, index, attempt + 1))
+                else:
+                    METRICS.inc("tasks_given_up")
+                    if on_giveup:
+                        on_giveup(item, e)
+                    else:
+                        logging.error(f"❌ {describe(item)} : {e}")
+            finally:
+                with condition:
+                    running -= 1
+                    condition.notify_all()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, min(workers, len(items))) - 1)]
+    for thread in threads:
+        thread.start()
+    worker()
+    for thread in threads:
+        thread.join()
+    return results
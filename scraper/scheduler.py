@@ -0,0 +1,62 @@
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Job:
+    """Tâche planifiable : `func()` lève une exception en cas d'échec ; `deps` = noms des jobs préalables"""
+
+    def __init__(self, name, func, deps=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+
+
+def run_jobs(jobs, max_parallel=2):
+    """
+    Exécute les jobs en parallèle (au plus `max_parallel` à la fois) dès que leurs dépendances ont réussi.
+    Un job dont une dépendance a échoué est marqué "skipped".
+    Renvoie {nom: {"status": "ok" | "failed" | "skipped", "duration": secondes}}.
+    """
+    pending = {job.name: job for job in jobs}
+    results = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        while pending or running:
+            for name, job in list(pending.items()):
+                dep_status = [results.get(dep, {}).get("status") for dep in job.deps]
+                if any(status in ("failed", "skipped") for status in dep_status):
+                    print(f"⏭️ Job '{name}' ignoré (dépendance en échec)")
+                    results[name] = {"status": "skipped", "duration": 0.0}
+                    del pending[name]
+                elif all(status == "ok" for status in dep_status) and len(running) < max_parallel:
+                    print(f"▶️ Job '{name}' démarré")
+                    running[executor.submit(_timed, job.func)] = name
+                    del pending[name]
+
+            if not running:
+                # Plus rien ne tourne : les jobs restants attendent une dépendance inconnue
+                for name in list(pending):
+                    print(f"⏭️ Job '{name}' ignoré (dépendance introuvable)")
+                    results[name] = {"status": "skipped", "duration": 0.0}
+                    del pending[name]
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                ok, duration = future.result()
+                results[name] = {"status": "ok" if ok else "failed", "duration": round(duration, 2)}
+                print(f"{'✅' if ok else '❌'} Job '{name}' terminé en {duration:.1f}s")
+
+    return results
+
+
+def _timed(func):
+    start = time.perf_counter()
+    try:
+        func()
+        return True, time.perf_counter() - start
+    except Exception:
+        traceback.print_exc()
+        return False, time.perf_counter() - start